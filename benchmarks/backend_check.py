@@ -0,0 +1,262 @@
+"""
+Checks for the Redis shared backend, run against a local stand-in Redis server
+
+Runs caching, single-flight loading, locking, and rate limiting through two backend instances (standing in for two
+bot processes), then checks that error replies and an unreachable server fall back to the in-process backend.
+
+Usage: python -m benchmarks.backend_check
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable
+
+parser = argparse.ArgumentParser(prog="Steam User Stats Bot Backend Check", description=__doc__)
+
+
+class FakeRedisServer:
+    """
+    A minimal Redis server, served from its own thread and event loop like a separate process would be
+
+    Supports only the commands the shared backend uses; its Lua scripts are recognized by their text and run in
+    Python. Commands in `failing_commands` return an error reply
+    """
+
+    def __init__(self, release_lock_script: str, take_token_script: str) -> None:
+        self.scripts: dict[str, Callable[[list[bytes], list[bytes]], Any]] = {
+            release_lock_script: self._release_lock,
+            take_token_script: self._take_token,
+        }
+        self.failing_commands: set[str] = set()
+
+        self._data: dict[bytes, tuple[Any, float | None]] = {}
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._server: asyncio.AbstractServer | None = None
+        self.port = 0
+        self.url = ""
+
+    def start(self) -> str:
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self.url
+
+    def stop(self) -> None:
+        async def close() -> None:
+            if self._server:
+                self._server.close()
+                await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result()
+
+    def restart(self) -> None:
+        """Start serving again on the same port, keeping the stored data"""
+
+        asyncio.run_coroutine_threadsafe(self._serve(), self._loop).result()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._loop.run_forever()
+
+    async def _serve(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port, reuse_address=True)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.url = f"redis://127.0.0.1:{self.port}/0"
+        self._ready.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int((await reader.readline())[1:-2])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+
+                writer.write(self._encode(self._run_command(args)))
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @classmethod
+    def _encode(cls, value: Any) -> bytes:
+        if isinstance(value, Exception):
+            return f"-ERR {value}\r\n".encode()
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(cls._encode(item) for item in value)
+
+        value = value if isinstance(value, bytes) else str(value).encode()
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _get(self, key: bytes) -> Any:
+        value, expires_at = self._data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        return value
+
+    def _run_command(self, args: list[bytes]) -> Any:
+        command = args[0].decode().upper()
+        if command in self.failing_commands:
+            return Exception(f"{command} is failing")
+
+        if command == "GET":
+            return self._get(args[1])
+        if command == "MGET":
+            return [self._get(key) for key in args[1:]]
+        if command == "SET":
+            options = [arg.decode().upper() for arg in args[3:]]
+            if "NX" in options and self._get(args[1]) is not None:
+                return None
+
+            ttl = int(options[options.index("PX") + 1]) / 1000 if "PX" in options else None
+            self._data[args[1]] = (args[2], time.monotonic() + ttl if ttl else None)
+            return b"OK"
+        if command == "EVAL":
+            num_keys = int(args[2])
+            return self.scripts[args[1].decode()](args[3 : 3 + num_keys], args[3 + num_keys :])
+
+        return Exception(f"unknown command '{command}'")
+
+    def _release_lock(self, keys: list[bytes], argv: list[bytes]) -> int:
+        if self._get(keys[0]) != argv[0]:
+            return 0
+
+        del self._data[keys[0]]
+        return 1
+
+    def _take_token(self, keys: list[bytes], argv: list[bytes]) -> bytes:
+        rate, capacity = float(argv[0]), float(argv[1])
+        now = time.monotonic()
+        tokens, updated_at = self._get(keys[0]) or (capacity, now)
+        tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._data[keys[0]] = ((tokens, now), now + capacity / rate + 1)
+        return str(wait).encode()
+
+
+def check(name: str, passed: bool) -> None:
+    print(f"{'ok' if passed else 'FAILED':<8}{name}")
+    if not passed:
+        raise SystemExit(1)
+
+
+async def run_checks() -> None:
+    from steam_user_stats_bot.models.exceptions import SharedBackendException
+    from steam_user_stats_bot.services.backends import RedisBackend
+
+    server = FakeRedisServer(RedisBackend._RELEASE_LOCK_SCRIPT, RedisBackend._TAKE_TOKEN_SCRIPT)
+    url = server.start()
+    backend_a, backend_b = RedisBackend(url, retry_interval=0.5), RedisBackend(url, retry_interval=0.5)
+
+    # caching
+    await backend_a.set("key", b"value", ttl=0.2)
+    check("values are shared between processes", await backend_b.get("key") == b"value")
+    check("get_many keeps key order", await backend_b.get_many(["missing", "key"]) == [None, b"value"])
+    await asyncio.sleep(0.3)
+    check("values expire after their ttl", await backend_b.get("key") is None)
+
+    # single-flight loading
+    loads = 0
+
+    async def load() -> bytes:
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.1)
+        return b"loaded"
+
+    values = await asyncio.gather(*[backend.get_or_load("load", 60, load) for backend in [backend_a, backend_b] * 5])
+    check("concurrent loads of a missing key only load it once", loads == 1 and set(values) == {b"loaded"})
+
+    # locking
+    holders: list[str] = []
+    overlapped = False
+
+    async def hold(backend: RedisBackend, name: str) -> None:
+        nonlocal overlapped
+        async with backend.lock("lock", ttl=5):
+            overlapped = overlapped or bool(holders)
+            holders.append(name)
+            await asyncio.sleep(0.05)
+            holders.remove(name)
+
+    await asyncio.gather(*[hold(backend, f"{i}") for i, backend in enumerate([backend_a, backend_b] * 3)])
+    check("locks are exclusive between processes", not overlapped)
+
+    # rate limiting
+    start = time.monotonic()
+    await asyncio.gather(*[backend.acquire_token("bucket", 20, 5) for backend in [backend_a, backend_b] * 8])
+    elapsed = time.monotonic() - start
+    check(f"rate limits are shared between processes ({elapsed:.2f}s for 16 tokens at 20/s)", 0.45 < elapsed < 1.5)
+
+    # error replies
+    try:
+        await backend_a.client.execute("NOT_A_COMMAND")
+        check("error replies raise SharedBackendException", False)
+    except SharedBackendException:
+        check("error replies raise SharedBackendException", True)
+
+    server.failing_commands = {"SET", "GET"}
+    await backend_a.set("failing", b"fallback", ttl=60)
+    check("error replies fall back to the in-process backend", await backend_a.get("failing") == b"fallback")
+    check("error replies don't mark Redis as unavailable", backend_a.is_available)
+    server.failing_commands = set()
+
+    # unreachable server
+    server.stop()
+    await backend_a.close()
+    await backend_a.set("offline", b"fallback", ttl=60)
+    check("an unreachable server marks Redis as unavailable", not backend_a.is_available)
+    check("an unreachable server falls back to the in-process backend", await backend_a.get("offline") == b"fallback")
+    async with backend_a.lock("offline"):
+        pass
+    await backend_a.acquire_token("offline", 20, 5)
+    check("locks and rate limits keep working while Redis is unavailable", True)
+
+    connect = backend_a.client._connect
+    connects = 0
+
+    async def counted_connect():
+        nonlocal connects
+        connects += 1
+        return await connect()
+
+    backend_a.client._connect = counted_connect  # type: ignore
+    await backend_a.get("offline")
+    check("Redis isn't retried until the retry interval passes", connects == 0)
+
+    server.restart()
+    await asyncio.sleep(0.6)
+    check("Redis is used again once it's reachable", await backend_a.get("load") == b"loaded" and connects == 1)
+
+    await backend_b.close()
+
+
+def main() -> None:
+    parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the bot package sets up its database on import
+        os.environ["DB_DIR"] = os.path.join(tmp_dir, "statsbot.db")
+        asyncio.run(run_checks())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Load test for the Discord commands, run against a local fake Steam backend and a temporary SQLite DB
+
+Drives simulated concurrent invocations of `setup`, `get_profile_url`, and `check_rare_achievements`,
+then reports throughput, latency percentiles, and event loop lag over time.
+
+Usage: python -m benchmarks.load_test --concurrency 50 --invocations 500
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, cast
+from urllib.parse import parse_qs, urlsplit
+
+parser = argparse.ArgumentParser(prog="Steam User Stats Bot Load Test", description=__doc__)
+parser.add_argument("--concurrency", type=int, default=25, help="number of simulated users invoking commands at once")
+parser.add_argument("--invocations", type=int, default=250, help="total number of commands to invoke")
+parser.add_argument("--games", type=int, default=200, help="number of games each simulated user owns")
+parser.add_argument("--achievements", type=int, default=20, help="number of achievements each game has")
+parser.add_argument("--latency", type=float, default=0.05, help="mean fake Steam API latency in seconds")
+parser.add_argument("--lag-interval", type=float, default=0.05, help="event loop lag sample interval in seconds")
+parser.add_argument("--seed", type=int, default=0)
+
+COMMAND_WEIGHTS = {"check_rare_achievements": 2, "get_profile_url": 5, "setup": 1}
+
+
+class FakeSteamBackend:
+    """A minimal Steam Web API, served from its own thread and event loop so it doesn't skew the bot's loop lag"""
+
+    def __init__(self, games: int, achievements: int, latency: float) -> None:
+        self.games = games
+        self.achievements = achievements
+        self.latency = latency
+        self.requests = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self.url = ""
+        self._routes: dict[str, Callable[[dict[str, list[str]]], Awaitable[dict[str, Any]]]] = {
+            "/ISteamUser/GetPlayerSummaries/v0002": self.player_summaries,
+            "/ISteamUser/ResolveVanityURL/v0001": self.resolve_vanity_url,
+            "/IPlayerService/GetOwnedGames/v0001": self.owned_games,
+            "/ISteamUserStats/GetPlayerAchievements/v0001": self.player_achievements,
+            "/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002": self.global_percentages,
+            "/ISteamUserStats/GetSchemaForGame/v2": self.schema,
+        }
+
+    def start(self) -> str:
+        threading.Thread(target=self._run, daemon=True).start()
+        self._ready.wait()
+        return self.url
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._serve())
+        self._loop.run_forever()
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve GET requests over a keep-alive HTTP/1.1 connection until the client closes it"""
+
+        try:
+            while request_line := await reader.readline():
+                # the fake API only serves GETs, so there's never a request body to read
+                while (await reader.readline()).strip():
+                    pass
+
+                _, target, _ = request_line.decode().split(" ", 2)
+                url = urlsplit(target)
+                if route := self._routes.get(url.path):
+                    status, body = "200 OK", json.dumps(await route(parse_qs(url.query))).encode()
+                else:
+                    status, body = "404 Not Found", b"{}"
+
+                headers = f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+                writer.write(headers.encode() + body)
+                await writer.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, body: dict[str, Any]) -> dict[str, Any]:
+        self.requests += 1
+        await asyncio.sleep(random.expovariate(1 / self.latency) if self.latency else 0)
+        return body
+
+    async def player_summaries(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        steam_ids = [steam_id for value in query["steamids"] for steam_id in value.split(",")]
+        players = [
+            {
+                "steamid": steam_id,
+                "personaname": f"Player {steam_id}",
+                "profileurl": f"https://steamcommunity.com/profiles/{steam_id}/",
+                "avatar": "",
+                "avatarmedium": "",
+                "avatarfull": "",
+                "personastate": 1,
+                "communityvisibilitystate": 3,
+                "profilestate": 1,
+                "lastlogoff": 1678000000,
+                "commentpermission": 1,
+            }
+            for steam_id in steam_ids
+        ]
+        return await self._respond({"response": {"players": players}})
+
+    async def resolve_vanity_url(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        return await self._respond({"response": {"steamid": str(abs(hash(query["vanityurl"][0]))), "success": 1}})
+
+    async def owned_games(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        games = [
+            {
+                "appid": app_id,
+                "playtime_forever": app_id * 10,
+                "playtime_windows_forever": app_id * 10,
+                "playtime_mac_forever": 0,
+                "playtime_linux_forever": 0,
+                "rtime_last_played": 1600000000 + app_id,
+            }
+            for app_id in range(1, self.games + 1)
+        ]
+        return await self._respond({"response": {"game_count": len(games), "games": games}})
+
+    async def player_achievements(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        app_id = int(query["appid"][0])
+        achievements = [
+            {"apiname": f"ACH_{app_id}_{i}", "achieved": int(i % 3 == 0), "unlocktime": 1600000000 + i}
+            for i in range(self.achievements)
+        ]
+        stats = {"steamID": query["steamid"][0], "gameName": f"Game {app_id}", "achievements": achievements}
+        return await self._respond({"playerstats": stats | {"success": True}})
+
+    async def global_percentages(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        app_id = int(query["gameid"][0])
+        achievements = [
+            {"name": f"ACH_{app_id}_{i}", "percent": (app_id * 31 + i * 17) % 1000 / 10}
+            for i in range(self.achievements)
+        ]
+        return await self._respond({"achievementpercentages": {"achievements": achievements}})
+
+    async def schema(self, query: dict[str, list[str]]) -> dict[str, Any]:
+        app_id = int(query["appid"][0])
+        achievements = [
+            {"name": f"ACH_{app_id}_{i}", "displayName": f"Achievement {i}", "description": "Do the thing", "hidden": 0}
+            for i in range(self.achievements)
+        ]
+        return await self._respond(
+            {"game": {"gameName": f"Game {app_id}", "availableGameStats": {"achievements": achievements}}}
+        )
+
+
+class FakeMessage:
+    async def delete(self) -> None:
+        pass
+
+    async def edit(self, **kwargs) -> None:
+        pass
+
+
+class FakeContext:
+    """Just enough of a discord.py command context to invoke a command callback"""
+
+    def __init__(self, user_id: int) -> None:
+        self.author = SimpleNamespace(id=user_id, name=f"user-{user_id}")
+        self.sent: list[tuple[str | None, dict]] = []
+
+    async def send(self, content: str | None = None, **kwargs) -> FakeMessage:
+        self.sent.append((content, kwargs))
+        return FakeMessage()
+
+
+def percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0
+
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def run_load_test(args: argparse.Namespace) -> None:
+    # these have to be imported after the environment is configured
+    import discord
+    from discord.ext.commands import Bot, Context
+
+    from steam_user_stats_bot.bots.discord.cogs.achievements import Achievements
+    from steam_user_stats_bot.bots.discord.cogs.setup import Setup
+    from steam_user_stats_bot.bots.discord.monitoring import EventLoopLagMonitor
+    from steam_user_stats_bot.config import DISCORD_RARE_ACHIEVEMENT_LIMIT
+
+    # adding the cogs to a bot (which is never logged in) binds their commands, so they can be called directly
+    bot = Bot(command_prefix="$", intents=discord.Intents.none())
+    achievements_cog, setup_cog = Achievements(bot), Setup(bot)
+    await bot.add_cog(achievements_cog)
+    await bot.add_cog(setup_cog)
+
+    commands: dict[str, Callable[[FakeContext], Awaitable[Any]]] = {
+        "check_rare_achievements": lambda ctx: achievements_cog.check_rare_achievements(
+            cast(Context, ctx), DISCORD_RARE_ACHIEVEMENT_LIMIT
+        ),
+        "get_profile_url": lambda ctx: setup_cog.get_profile_url(cast(Context, ctx)),
+        "setup": lambda ctx: setup_cog.setup(cast(Context, ctx), "FAKEKEY", str(76561190000000000 + ctx.author.id)),
+    }
+
+    # every simulated user runs setup first, so the other commands have someone to look up
+    print(f"Setting up {args.concurrency} users...")
+    await asyncio.gather(*[commands["setup"](FakeContext(user_id)) for user_id in range(args.concurrency)])
+
+    latencies: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    remaining = args.invocations
+
+    async def worker(user_id: int) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name = random.choices(list(COMMAND_WEIGHTS), weights=list(COMMAND_WEIGHTS.values()))[0]
+
+            start = time.perf_counter()
+            try:
+                await commands[name](FakeContext(user_id))
+                latencies[name].append(time.perf_counter() - start)
+            except Exception as e:
+                errors[name] += 1
+                print(f"{name} failed: {type(e).__name__}: {e}", file=sys.stderr)
+
+    monitor = EventLoopLagMonitor(interval=args.lag_interval, threshold=float("inf"))
+    monitor.start()
+
+    print(f"Invoking {args.invocations} commands from {args.concurrency} concurrent users...")
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(user_id) for user_id in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+
+    completed = sum(len(values) for values in latencies.values())
+    print(f"\nCompleted {completed} commands in {elapsed:.2f}s ({completed / elapsed:.1f} commands/s)\n")
+    print(f"{'command':<26}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name in COMMAND_WEIGHTS:
+        values = latencies[name]
+        print(
+            f"{name:<26}{len(values):>7}{errors[name]:>8}"
+            + "".join(f"{percentile(values, pct):>8.3f}s" for pct in [50, 95, 99])
+            + f"{max(values, default=0):>8.3f}s"
+        )
+
+    lags = [lag for _, lag in monitor.samples]
+    print(
+        f"\nEvent loop lag: p50 {percentile(lags, 50) * 1000:.1f}ms, p99 {percentile(lags, 99) * 1000:.1f}ms, "
+        + f"max {monitor.max_lag * 1000:.1f}ms"
+    )
+
+    # max lag per second of the run
+    lag_by_second: dict[int, float] = defaultdict(float)
+    first_sample = monitor.samples[0][0] if monitor.samples else 0
+    for sampled_at, lag in monitor.samples:
+        second = int(sampled_at - first_sample)
+        lag_by_second[second] = max(lag_by_second[second], lag)
+
+    for second, lag in sorted(lag_by_second.items()):
+        print(f"  {second:>4}s {lag * 1000:>8.1f}ms {'#' * min(int(lag * 1000 / 10), 60)}")
+
+
+def main() -> None:
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    backend = FakeSteamBackend(args.games, args.achievements, args.latency)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DB_DIR"] = os.path.join(tmp_dir, "statsbot.db")
+        os.environ["STEAM_WEB_API_BASE_URL"] = backend.start()
+        os.environ.setdefault("STEAM_RESPONSE_CACHE_DIR", os.path.join(tmp_dir, "steam_cache.db"))
+        os.environ.setdefault("PROFILING_OUTPUT_DIR", os.path.join(tmp_dir, "profiles"))
+
+        from steam_user_stats_bot.db.setup import init_db
+
+        init_db()
+        asyncio.run(run_load_test(args))
+        print(f"\nFake Steam backend served {backend.requests} requests")
+
+
+if __name__ == "__main__":
+    main()
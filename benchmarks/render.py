@@ -0,0 +1,166 @@
+"""
+Benchmark for achievement rendering and message packing, compared with the previous implementations
+
+Renders a large set of fake achievements into pages (cold, then with the render cache warm), and packs the rendered
+blocks into Discord messages.
+
+Usage: python -m benchmarks.render --achievements 10000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+parser = argparse.ArgumentParser(prog="Steam User Stats Bot Render Benchmark", description=__doc__)
+parser.add_argument("--achievements", type=int, default=10000, help="number of achievements to render")
+parser.add_argument("--games", type=int, default=200, help="number of games the achievements are spread across")
+parser.add_argument("--page-size", type=int, default=6, help="achievements per page")
+parser.add_argument("--repeat", type=int, default=5, help="number of timed runs of each case; the best is reported")
+parser.add_argument("--seed", type=int, default=0)
+
+
+def reference_format_achievement(achievement, include_game: bool = True) -> str:
+    """The list-building formatter which the render layer replaced"""
+
+    builder: list[str] = []
+    if include_game:
+        builder.append(f"[{achievement.game_name.upper()}]")
+        builder.append("-----")
+
+    builder.append(achievement.display_name or achievement.api_name)
+    if achievement.description:
+        builder.append(achievement.description)
+
+    builder.append("")
+    if achievement.achieved:
+        component = "Achieved"
+        if achievement.achieved_at:
+            component += f" {achievement.achieved_at.strftime('%b %d, %Y')}"
+
+        builder.append(component)
+    else:
+        builder.append("Not Achieved")
+
+    if achievement.global_percent is not None:
+        builder.append(f"{achievement.global_percent:.1f}% of players have this achievement")
+
+    nl = "\n"
+    return f"```{nl.join(builder)}```"
+
+
+def reference_consolidate_message_parts(parts: list[str], sep: str = "\n", max_length: int = 2000) -> list[str]:
+    """The packer which `consolidate_message_parts` replaced"""
+
+    consolidated_parts: list[str] = []
+    consolidated_part_len = 0
+    components: list[str] = []
+    for part in parts:
+        if len(part) > max_length:
+            sub_part = part
+            while len(sub_part) > max_length:
+                consolidated_parts.append(sub_part[:max_length])
+                sub_part = sub_part[max_length:]
+
+            consolidated_parts.append(sub_part)
+            continue
+
+        components.append(part)
+        consolidated_part_len += len(part)
+        if consolidated_part_len + (len(sep) * (len(components) - 1)) > max_length:
+            consolidated_parts.append(sep.join(components[:-1]))
+            components = components[-1:]
+            consolidated_part_len = len(part)
+
+    if components:
+        consolidated_parts.append(sep.join(components))
+
+    return consolidated_parts
+
+
+def build_achievements(count: int, games: int):
+    from steam_user_stats_bot.models.steam import SteamUserGameStatsAchievement
+
+    # built from API-shaped dicts, which carry unlock times as unix timestamps
+    start = datetime(2010, 1, 1)
+    return [
+        SteamUserGameStatsAchievement.parse_obj(
+            {
+                "app_id": str(random.randrange(games)),
+                "game_name": f"Game {random.randrange(games)}",
+                "apiname": f"ACH_{i}",
+                "name": f"Achievement {i}",
+                "description": random.choice([None, f"Do the thing number {i} without dying"]),
+                "achieved": random.random() < 0.7,
+                "unlocktime": int((start + timedelta(minutes=random.randrange(5_000_000))).timestamp()),
+                "global_percent": round(random.uniform(0.1, 100), 4),
+            }
+        )
+        for i in range(count)
+    ]
+
+
+def best_of(repeat: int, func: Callable[[], object], before: Callable[[], object] | None = None) -> float:
+    timings: list[float] = []
+    for _ in range(repeat):
+        if before:
+            before()
+
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def run_benchmark(args: argparse.Namespace) -> None:
+    from steam_user_stats_bot.bots.discord.rendering import clear_render_cache, render_achievement_pages
+    from steam_user_stats_bot.bots.discord.utils import consolidate_message_parts
+
+    achievements = build_achievements(args.achievements, args.games)
+
+    def reference_pages() -> list[str]:
+        return [
+            "\n".join(
+                [reference_format_achievement(achievement) for achievement in achievements[i : i + args.page_size]]
+            )
+            for i in range(0, len(achievements), args.page_size)
+        ]
+
+    def pages() -> list[str]:
+        return render_achievement_pages(achievements, args.page_size)
+
+    clear_render_cache()
+    assert pages() == reference_pages(), "rendered pages don't match the reference formatter"
+
+    blocks = [reference_format_achievement(achievement) for achievement in achievements]
+    assert "".join(consolidate_message_parts(blocks)) == "".join(reference_consolidate_message_parts(blocks))
+
+    results = {
+        "render (reference)": best_of(args.repeat, reference_pages),
+        "render (cold cache)": best_of(args.repeat, pages, before=clear_render_cache),
+        "render (warm cache)": best_of(args.repeat, pages),
+        "pack (reference)": best_of(args.repeat, lambda: reference_consolidate_message_parts(blocks)),
+        "pack": best_of(args.repeat, lambda: consolidate_message_parts(blocks)),
+    }
+
+    print(f"{args.achievements:,} achievements across {args.games:,} games, best of {args.repeat} runs\n")
+    for case, seconds in results.items():
+        print(f"{case:<22}{seconds * 1000:>10.2f} ms{args.achievements / seconds:>14,.0f} achievements/s")
+
+
+def main() -> None:
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the bot package sets up its database on import
+        os.environ["DB_DIR"] = os.path.join(tmp_dir, "statsbot.db")
+        run_benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,53 @@
 import argparse
+import asyncio
 
-from steam_user_stats_bot.bots.discord.bot import init_bot
 from steam_user_stats_bot.db.setup import init_db
 
 parser = argparse.ArgumentParser(prog="Steam User Stats Bot", description="Discord bot for steam user stats")
-parser.add_argument("discord_key", type=str, help="your Discord Bot API Key")
+parser.add_argument("discord_key", type=str, nargs="?", help="your Discord Bot API Key; not needed with --report")
+parser.add_argument(
+    "--report",
+    action="store_true",
+    help="compute rarity and completion reports for users without connecting to Discord, then exit",
+)
+parser.add_argument(
+    "--users", type=str, nargs="+", metavar="DISCORD_USER_ID", help="only report on these users (default: all)"
+)
+parser.add_argument("--output-dir", type=str, default="data/reports", help="where to write reports")
+parser.add_argument("--concurrency", type=int, default=5, help="max number of users to report on at once")
+
+
+async def run_reports(args: argparse.Namespace) -> None:
+    from steam_user_stats_bot.services import offload
+    from steam_user_stats_bot.services.backends import shared_backend
+    from steam_user_stats_bot.services.rarity import rarity_snapshots
+    from steam_user_stats_bot.services.reports import ReportGenerator
+    from steam_user_stats_bot.services.unlocks import unlock_history
+
+    try:
+        await ReportGenerator(args.output_dir, max_concurrency=args.concurrency).generate(args.users)
+        if rarity_snapshots:
+            # batch runs are a good time to pre-warm the snapshot for the bot
+            await rarity_snapshots.rebuild()
+    finally:
+        await unlock_history.flush()
+        await shared_backend.close()
+        offload.shutdown()
 
 
 def main() -> None:
     args = parser.parse_args()
-    discord_key: str = args.discord_key
+    if not (args.report or args.discord_key):
+        parser.error("discord_key is required unless running with --report")
 
     init_db()
-    init_bot(discord_key)
+    if args.report:
+        asyncio.run(run_reports(args))
+        return
+
+    from steam_user_stats_bot.bots.discord.bot import init_bot
+
+    init_bot(args.discord_key)
 
 
 if __name__ == "__main__":
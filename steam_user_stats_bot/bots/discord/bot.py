@@ -1,15 +1,134 @@
 import asyncio
+from logging import getLogger
 
 import discord
-from discord.ext.commands import Bot
+from cachetools import LRUCache
+from discord.ext.commands import Bot, Context
 
-from ...config import DISCORD_BOT_PREFIX
+from ...config import (
+    BACKGROUND_REFRESH_ENABLED,
+    DISCORD_BOT_PREFIX,
+    DISCORD_MAX_MESSAGES,
+    EVENT_LOOP_LAG_MONITOR_INTERVAL,
+    EVENT_LOOP_LAG_THRESHOLD,
+    LOW_MEMORY_MODE,
+    PROFILING_ENABLED,
+)
 from ...models.bots import DiscordCogBase
+from ...models.db import NotificationSubscription
+from ...models.steam import SteamUserGameStatsAchievement
+from ...services import offload
+from ...services.db import GuildMemberDBService
+from ...services.notifications import UnlockNotifier
+from ...services.rarity import rarity_snapshots
+from ...services.refresh import refresh_scheduler
+from ...services.unlocks import unlock_history
+from . import profiling
 from .cogs import all_cogs
+from .cogs.achievements import Achievements
+from .monitoring import EventLoopLagMonitor
+from .utils import consolidate_message_parts
 
-intents = discord.Intents.default()
-intents.message_content = True
-bot = Bot(command_prefix=DISCORD_BOT_PREFIX, intents=intents)
+logger = getLogger("bot")
+
+guild_members_db = GuildMemberDBService()
+
+SAVED_MEMBER_CACHE_SIZE = 10_000
+"""Max number of guild members whose saved display names are remembered, to skip redundant database writes"""
+
+
+class StatsBot(Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lag_monitor = EventLoopLagMonitor(EVENT_LOOP_LAG_MONITOR_INTERVAL, EVENT_LOOP_LAG_THRESHOLD)
+        self.unlock_notifier = UnlockNotifier(self.post_unlocks)
+        self._saved_members: LRUCache[tuple[str, str], str] = LRUCache(maxsize=SAVED_MEMBER_CACHE_SIZE)
+
+    async def setup_hook(self) -> None:
+        if EVENT_LOOP_LAG_MONITOR_INTERVAL > 0:
+            self.lag_monitor.start()
+
+        if BACKGROUND_REFRESH_ENABLED:
+            refresh_scheduler.start()
+
+        self.unlock_notifier.start()
+        if rarity_snapshots:
+            rarity_snapshots.start()
+
+    async def post_unlocks(
+        self, subscription: NotificationSubscription, achievements: list[SteamUserGameStatsAchievement]
+    ) -> None:
+        channel = self.get_channel(int(subscription.channel_id))
+        if not isinstance(channel, discord.abc.Messageable):
+            logger.warning(f"Can't post unlocks for user {subscription.user_id} to channel {subscription.channel_id}")
+            return
+
+        # rarest first
+        achievements = sorted(achievements, key=lambda x: x.global_percent or 0)
+        parts = [f"<@{subscription.user_id}> unlocked {len(achievements)} new achievement(s)!"]
+        parts.extend(Achievements.format_achievement(achievement) for achievement in achievements)
+        for message in consolidate_message_parts(parts):
+            await channel.send(message, allowed_mentions=discord.AllowedMentions(users=False))
+
+    async def on_command(self, ctx: Context) -> None:
+        refresh_scheduler.record_activity(ctx.author.id)
+        if ctx.guild:
+            await self.save_member(str(ctx.guild.id), str(ctx.author.id), ctx.author.display_name)
+
+    async def save_member(self, guild_id: str, user_id: str, display_name: str) -> None:
+        """Record that a user is in a guild, so guild-wide commands can find them without asking Discord"""
+
+        key = (guild_id, user_id)
+        if self._saved_members.get(key) == display_name:
+            return
+
+        await asyncio.to_thread(guild_members_db.save_member, guild_id, user_id, display_name)
+        self._saved_members[key] = display_name
+
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        await asyncio.to_thread(guild_members_db.delete_guild, str(guild.id))
+        for key in [key for key in self._saved_members if key[0] == str(guild.id)]:
+            self._saved_members.pop(key, None)
+
+    async def close(self) -> None:
+        self.lag_monitor.stop()
+        refresh_scheduler.stop()
+        self.unlock_notifier.stop()
+        offload.shutdown()
+        await unlock_history.flush()
+        if rarity_snapshots:
+            rarity_snapshots.stop()
+            try:
+                # otherwise percentages fetched since the last rebuild are lost
+                await rarity_snapshots.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild rarity snapshot on shutdown")
+
+        await super().close()
+
+
+if LOW_MEMORY_MODE:
+    # just enough to receive prefix commands and look up channels for notifications
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    intents.message_content = True
+    bot = StatsBot(
+        command_prefix=DISCORD_BOT_PREFIX,
+        intents=intents,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        max_messages=DISCORD_MAX_MESSAGES,
+        chunk_guilds_at_startup=False,
+    )
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    bot = StatsBot(command_prefix=DISCORD_BOT_PREFIX, intents=intents, max_messages=DISCORD_MAX_MESSAGES)
+
+if PROFILING_ENABLED:
+    bot.before_invoke(profiling.before_invoke)
+    bot.after_invoke(profiling.after_invoke)
 
 
 def init_bot(token: str, **kwargs):
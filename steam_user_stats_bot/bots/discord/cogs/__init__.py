@@ -2,9 +2,12 @@ from typing import Type
 
 from ....models.bots import DiscordCogBase
 from .achievements import Achievements
+from .compare import Compare
+from .friends import Friends
 from .general import General
+from .playtime import Playtime
 from .setup import Setup
 
 
 def all_cogs() -> list[Type[DiscordCogBase]]:
-    return [Achievements, General, Setup]
+    return [Achievements, Compare, Friends, General, Playtime, Setup]
@@ -1,96 +1,218 @@
-import Paginator  # type: ignore
-from discord import Embed
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Literal
+
+from discord import Embed, File
+from discord.ext import commands
 from discord.ext.commands import Context, command
 
-from ....config import DISCORD_ACHIEVEMENT_PAGE_SIZE, DISCORD_PAGINATOR_TIMEOUT
+from ....config import (
+    DISCORD_ACHIEVEMENT_PAGE_SIZE,
+    DISCORD_BOT_PREFIX,
+    DISCORD_RARE_ACHIEVEMENT_LIMIT,
+    STEAM_ACHIEVEMENT_FETCH_DEADLINE,
+)
 from ....models.bots import DiscordCogBase
 from ....models.exceptions import UserNotSetupException
 from ....models.steam import SteamUserGameStatsAchievement
-from ....services.steam import SteamUserService
+from ....services.db import GuildMemberDBService, NotificationDBService, UserAchievementDBService
+from ....services.export import ExportFormat, write_achievement_export
+from ....services.offload import run_cpu_bound
+from ....services.steam import AchievementFetchMode, SteamUserService, rank_rarest_achievements
 from .. import db, require_setup_user
-from ..utils import chunk_list
+from ..profiling import stage
+from ..rendering import render_achievement, render_achievement_pages
+from ..utils import pack_embeds, start_paginator
+
+logger = getLogger("achievements")
+
+DEFAULT_FILE_SIZE_LIMIT = 10 * 1024 * 1024
+"""Discord's upload limit in bytes outside of boosted servers"""
+MAX_RARE_ACHIEVEMENT_LIMIT = 500
+MAX_RECENT_UNLOCK_DAYS = 90
+MAX_RECENT_UNLOCKS = 200
+
+guild_members_db = GuildMemberDBService()
+notifications_db = NotificationDBService()
+unlocks_db = UserAchievementDBService()
 
 
 class Achievements(DiscordCogBase):
     @classmethod
     def format_achievement(cls, achievement: SteamUserGameStatsAchievement, include_game: bool = True) -> str:
-        builder: list[str] = []
-
-        # HALF-LIFE 2
-        # -----
-        if include_game:
-            builder.append(f"[{achievement.game_name.upper()}]")
-            builder.append("-----")
-
-        # Lambda Locator
-        # Find all lambda caches in Half-Life 2.
-        builder.append(achievement.display_name or achievement.api_name)
-        if achievement.description:
-            builder.append(achievement.description)
-
-        #
-        # Achieved Nov 16, 2004
-        builder.append("")
-        if achievement.achieved:
-            component = "Achieved"
-            if achievement.achieved_at:
-                component += f" {achievement.achieved_at.strftime('%b %d, %Y')}"
-
-            builder.append(component)
-        else:
-            builder.append("Not Achieved")
-
-        # 3.33% of players have this achievement
-        if achievement.global_percent is not None:
-            builder.append(f"{achievement.global_percent:.1f}% of players have this achievement")
-
-        nl = "\n"
-        return f"```{nl.join(builder)}```"
+        return render_achievement(achievement, include_game)
 
     @command()
     @require_setup_user()
-    async def check_rare_achievements(self, ctx: Context):
+    async def check_rare_achievements(
+        self,
+        ctx: Context,
+        limit: int = commands.parameter(
+            default=DISCORD_RARE_ACHIEVEMENT_LIMIT, description="How many achievements to show"
+        ),
+    ):
         """Show your rarest achievements"""
 
-        user = db.get_user(ctx.author.id)
+        limit = min(max(limit, 1), MAX_RARE_ACHIEVEMENT_LIMIT)
+
+        with stage("db"):
+            user = db.get_user(ctx.author.id)
         if not (user and user.steam_api_key and user.steam_id_64):
             return
 
         status_message = await ctx.send("Fetching achievement data, hang tight!")
         try:
+            deadline = asyncio.get_running_loop().time() + STEAM_ACHIEVEMENT_FETCH_DEADLINE
             steam = SteamUserService(user.steam_api_key)
-            all_owned_games = await steam.get_owned_games(user.steam_id_64)
-            stats = await steam.get_user_achievements(
-                user.steam_id_64,
-                [game.app_id for game in all_owned_games],
-                include_global_percentages=True,
-            )
+            with stage("owned_games"):
+                all_owned_games = await steam.get_owned_games(user.steam_id_64)
+            with stage("achievements"):
+                scan = await steam.get_rarest_user_achievements_before_deadline(
+                    user.steam_id_64, all_owned_games, limit, deadline
+                )
 
-            achievements = [achievement for stat in stats for achievement in stat.achievements if achievement.achieved]
-            achievements.sort(key=lambda x: x.global_percent or 0)
+            with stage("ranking"):
+                achievements = await rank_rarest_achievements(scan.stats, limit)
+            with stage("rendering"):
+                pages = await run_cpu_bound(
+                    render_achievement_pages, achievements, DISCORD_ACHIEVEMENT_PAGE_SIZE, size=len(achievements)
+                )
+
+            # Scanned 812/2,140 games (time limit reached)
+            footer = scan.coverage.capitalize()
+            if not scan.is_complete:
+                footer += " (time limit reached)"
 
             embeds: list[Embed] = []
-            for chunk in chunk_list(achievements, DISCORD_ACHIEVEMENT_PAGE_SIZE):
-                embeds.append(
-                    Embed(
-                        title=f"Your Achievements",
-                        description="\n".join([self.format_achievement(achievement) for achievement in chunk]),
-                    )
-                )
+            for page in pages:
+                embed = Embed(title=f"Your Achievements", description=page)
+                embed.set_footer(text=footer)
+                embeds.append(embed)
 
         except Exception:
             await status_message.delete()
             raise
 
         await status_message.delete()
-        await Paginator.Simple(timeout=DISCORD_PAGINATOR_TIMEOUT).start(ctx, pages=embeds)
+        await start_paginator(ctx, embeds)
+
+    @command()
+    @require_setup_user()
+    async def export_achievements(
+        self,
+        ctx: Context,
+        format: Literal["csv", "ndjson"] = commands.parameter(default="csv", description="Either csv or ndjson"),
+    ):
+        """Export all of your achievements to a compressed file"""
+
+        user = db.get_user(ctx.author.id)
+        if not (user and user.steam_api_key and user.steam_id_64):
+            return
+
+        status_message = await ctx.send("Exporting achievement data, this may take a while!")
+        try:
+            # exports include locked achievements and unlock times, which batched fetching doesn't return
+            steam = SteamUserService(user.steam_api_key, fetch_mode=AchievementFetchMode.per_app)
+            all_owned_games = await steam.get_owned_games(user.steam_id_64)
+            stats = steam.iter_user_achievements(
+                user.steam_id_64, [game.app_id for game in all_owned_games], include_global_percentages=True
+            )
+
+            # stream to disk rather than memory; discord.File needs a real file object, which SpooledTemporaryFile
+            # isn't until Python 3.11
+            with tempfile.TemporaryFile() as f:
+                rows = await write_achievement_export(stats, all_owned_games, ExportFormat(format), f)
+                size = f.tell()
+                f.seek(0)
+
+                if size > (ctx.guild.filesize_limit if ctx.guild else DEFAULT_FILE_SIZE_LIMIT):
+                    await ctx.send("Sorry, your export is too large to upload to Discord")
+                    return
+
+                await ctx.send(
+                    f"Exported {rows:,} achievements from {len(all_owned_games):,} games",
+                    file=File(f, filename=f"achievements.{format}.gz"),
+                )
+
+        finally:
+            await status_message.delete()
+
+    @command()
+    @require_setup_user()
+    async def notify_unlocks(
+        self,
+        ctx: Context,
+        enabled: bool = commands.parameter(default=True, description="Either on or off"),
+    ):
+        """Get notified in this channel when you unlock new achievements"""
+
+        if not ctx.guild:
+            await ctx.send("Notifications can only be posted in a server channel")
+            return
+
+        if not enabled:
+            notifications_db.unsubscribe(str(ctx.author.id))
+            await ctx.send("You won't be notified about new achievements anymore")
+            return
+
+        notifications_db.subscribe(str(ctx.author.id), str(ctx.guild.id), str(ctx.channel.id))
+        await ctx.send(
+            "You'll be notified in this channel when you unlock new achievements! "
+            + f"Run `{DISCORD_BOT_PREFIX}notify_unlocks off` to stop"
+        )
+
+    @command()
+    async def recent_unlocks(
+        self,
+        ctx: Context,
+        days: int = commands.parameter(default=7, description="How many days back to look"),
+    ):
+        """Show achievements recently unlocked by members of this server who have used the bot here"""
+
+        if not ctx.guild:
+            await ctx.send("Recent unlocks can only be shown in a server")
+            return
+
+        days = min(max(days, 1), MAX_RECENT_UNLOCK_DAYS)
+        since = datetime.now() - timedelta(days=days)
+
+        # members are recorded as they run commands, so they don't need to be looked up from Discord
+        guild_id = str(ctx.guild.id)
+        unlocks = unlocks_db.get_recent_unlocks(guild_id, since, MAX_RECENT_UNLOCKS)
+        if not unlocks:
+            await ctx.send(f"Nobody here has unlocked any achievements in the last {days} days")
+            return
+
+        names = guild_members_db.get_display_names(guild_id, list({unlock.user_id for unlock in unlocks}))
+
+        # **Gordon** unlocked **Lambda Locator** in Half-Life 2
+        # Nov 16, 2004 - 3.3% of players
+        parts: list[str] = []
+        for unlock in unlocks:
+            details = [unlock.achieved_at.strftime("%b %d, %Y")] if unlock.achieved_at else []
+            if unlock.global_percent is not None:
+                details.append(f"{unlock.global_percent:.1f}% of players")
+
+            # a member can be missing if they were removed since their unlocks were read
+            name = names.get(unlock.user_id) or f"<@{unlock.user_id}>"
+            parts.append(
+                f"**{name}** unlocked **{unlock.display_name or unlock.api_name}** "
+                + f"in {unlock.game_name}\n{' - '.join(details)}\n"
+            )
+
+        await start_paginator(ctx, pack_embeds(f"Unlocked in the Last {days} Days", parts))
 
+    @recent_unlocks.error
+    @notify_unlocks.error
+    @export_achievements.error
     @check_rare_achievements.error
     async def achievement_error(self, ctx: Context, ex: Exception):
         if isinstance(ex, UserNotSetupException):
             # require_setup_user already handles this
             return
 
-        print(f"{type(ex).__name__}: {ex}")  # TODO: have better exception logging
+        logger.exception(f"{ctx.command} failed for user {ctx.author.id}", exc_info=ex)
         await ctx.send("Oops, something went wrong!")
         return
@@ -0,0 +1,97 @@
+from logging import getLogger
+
+from discord import Embed, Member
+from discord.ext import commands
+from discord.ext.commands import Context, command
+
+from ....config import (
+    DISCORD_ACHIEVEMENT_PAGE_SIZE,
+    DISCORD_BOT_PREFIX,
+    DISCORD_RARE_ACHIEVEMENT_LIMIT,
+)
+from ....models.bots import DiscordCogBase
+from ....models.exceptions import UserNotSetupException
+from ....models.steam import SteamUserGameStatsAchievement
+from ....services.compare import compare_libraries
+from ....services.steam import SteamUserService
+from .. import db, require_setup_user
+from ..rendering import render_achievement_pages
+from ..utils import pack_embeds, start_paginator
+
+logger = getLogger("compare")
+
+MAX_SHARED_GAMES_SHOWN = 50
+
+
+class Compare(DiscordCogBase):
+    @classmethod
+    def achievement_pages(cls, title: str, achievements: list[SteamUserGameStatsAchievement]) -> list[Embed]:
+        return [
+            Embed(title=title, description=page)
+            for page in render_achievement_pages(
+                achievements[:DISCORD_RARE_ACHIEVEMENT_LIMIT], DISCORD_ACHIEVEMENT_PAGE_SIZE
+            )
+        ]
+
+    @command()
+    @require_setup_user()
+    async def compare(
+        self, ctx: Context, member: Member = commands.parameter(description="The server member to compare with")
+    ):
+        """Compare your games and achievements with another member's"""
+
+        user = db.get_user(ctx.author.id)
+        if not (user and user.steam_api_key and user.steam_id_64):
+            return
+
+        other_user = db.get_user(member.id)
+        if not (other_user and other_user.steam_api_key and other_user.steam_id_64):
+            await ctx.send(f"{member.display_name} hasn't set up yet")
+            return
+
+        status_message = await ctx.send("Comparing libraries, hang tight!")
+        try:
+            comparison = await compare_libraries(
+                SteamUserService(user.steam_api_key),
+                user.steam_id_64,
+                SteamUserService(other_user.steam_api_key),
+                other_user.steam_id_64,
+            )
+
+        finally:
+            await status_message.delete()
+
+        if not comparison.shared_games:
+            await ctx.send(f"You and {member.display_name} don't have any games in common")
+            return
+
+        # You share 42 games with Gordon
+        # Half-Life 2
+        # ...
+        parts = [f"You share {len(comparison.shared_games):,} games with {member.display_name}", ""]
+        parts.extend(game.name or game.app_id for game in comparison.shared_games[:MAX_SHARED_GAMES_SHOWN])
+        if len(comparison.shared_games) > MAX_SHARED_GAMES_SHOWN:
+            parts.append(f"...and {len(comparison.shared_games) - MAX_SHARED_GAMES_SHOWN:,} more")
+
+        embeds = pack_embeds("Shared Games", parts)
+        embeds.extend(self.achievement_pages("Only You Have", comparison.only_first))
+        embeds.extend(self.achievement_pages(f"Only {member.display_name} Has", comparison.only_second))
+        await start_paginator(ctx, embeds)
+
+    @compare.error
+    async def compare_error(self, ctx: Context, ex: Exception):
+        if isinstance(ex, UserNotSetupException):
+            # require_setup_user already handles this
+            return
+
+        if isinstance(ex, commands.MissingRequiredArgument):
+            await ctx.send(f"Mention who you want to compare with\nEx: `{DISCORD_BOT_PREFIX}compare @Gordon`")
+            return
+
+        if isinstance(ex, commands.MemberNotFound):
+            await ctx.send("I couldn't find that member")
+            return
+
+        logger.exception(f"{ctx.command} failed for user {ctx.author.id}", exc_info=ex)
+        await ctx.send("Oops, something went wrong!")
+        return
@@ -0,0 +1,72 @@
+from logging import getLogger
+
+from discord.ext.commands import Context, command
+
+from ....models.bots import DiscordCogBase
+from ....models.exceptions import UserNotSetupException
+from ....models.steam import SteamUser, SteamUserStatus
+from ....services.steam import SteamUserService
+from .. import db, require_setup_user
+from ..utils import pack_embeds, start_paginator
+
+logger = getLogger("friends")
+
+
+class Friends(DiscordCogBase):
+    @classmethod
+    def group_friends(cls, friends: list[SteamUser]) -> dict[str, list[SteamUser]]:
+        """Group online friends by what they're doing, with in-game friends first"""
+
+        groups: dict[str, list[SteamUser]] = {"In Game": []}
+        groups.update({status.name.replace("_", " ").title(): [] for status in SteamUserStatus})
+        for friend in friends:
+            if friend.is_in_game:
+                groups["In Game"].append(friend)
+            elif friend.status is not SteamUserStatus.offline:
+                groups[friend.status.name.replace("_", " ").title()].append(friend)
+
+        return {
+            group: sorted(members, key=lambda x: x.display_name.lower()) for group, members in groups.items() if members
+        }
+
+    @command()
+    @require_setup_user()
+    async def friends_online(self, ctx: Context):
+        """Show which of your Steam friends are online"""
+
+        user = db.get_user(ctx.author.id)
+        if not (user and user.steam_api_key and user.steam_id_64):
+            return
+
+        steam = SteamUserService(user.steam_api_key)
+        friend_ids = await steam.get_friend_ids(user.steam_id_64)
+        if not friend_ids:
+            await ctx.send("No friends found. Make sure your friends list is public")
+            return
+
+        groups = self.group_friends(await steam.get_user_summaries(friend_ids))
+        if not groups:
+            await ctx.send("None of your friends are online")
+            return
+
+        # **In Game**
+        # Gordon - Half-Life 2
+        parts: list[str] = []
+        for group, friends in groups.items():
+            parts.append(f"**{group}** ({len(friends)})")
+            for friend in friends:
+                parts.append(f"{friend.display_name} - {friend.game_name}" if friend.game_name else friend.display_name)
+
+            parts.append("")
+
+        await start_paginator(ctx, pack_embeds("Friends Online", parts))
+
+    @friends_online.error
+    async def friends_error(self, ctx: Context, ex: Exception):
+        if isinstance(ex, UserNotSetupException):
+            # require_setup_user already handles this
+            return
+
+        logger.exception(f"{ctx.command} failed for user {ctx.author.id}", exc_info=ex)
+        await ctx.send("Oops, something went wrong!")
+        return
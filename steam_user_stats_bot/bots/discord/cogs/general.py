@@ -1,6 +1,17 @@
-from discord.ext.commands import Context, command
+from discord.ext.commands import Context, command, is_owner
 
+from ....config import DISCORD_RENDER_CACHE_MAX_BYTES, LOW_MEMORY_MODE
 from ....models.bots import DiscordCogBase
+from ....services.backends import InProcessBackend, shared_backend
+from ....services.playtime import playtime_tables
+from ....services.steam import response_cache, schema_cache
+from ..monitoring import current_rss_bytes
+from ..rendering import render_cache_size
+from ..utils import count_live_paginators
+
+
+def _mb(size: int | float) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
 
 
 class General(DiscordCogBase):
@@ -9,3 +20,44 @@ class General(DiscordCogBase):
         """Ping me!"""
 
         await ctx.send("Pong!")
+
+    @command(hidden=True)
+    @is_owner()
+    async def cache_stats(self, ctx: Context):
+        """Show Steam response cache hits and misses"""
+
+        if not response_cache:
+            await ctx.send("The Steam response cache is disabled")
+            return
+
+        stats = response_cache.stats
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0
+        await ctx.send(
+            f"Hits: {stats['hits']:,} / Misses: {stats['misses']:,} ({hit_rate:.1f}% hit rate)\n"
+            + f"Size: {stats['bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.1f} MB"
+        )
+
+    @command(hidden=True)
+    @is_owner()
+    async def memory(self, ctx: Context):
+        """Show memory usage"""
+
+        lines = [
+            f"RSS: {_mb(current_rss_bytes())}" + (" (low-memory mode)" if LOW_MEMORY_MODE else ""),
+            f"Schema cache: {_mb(schema_cache.currsize)} / {_mb(schema_cache.maxsize)} ({len(schema_cache):,} games)",
+            f"Playtime tables: {_mb(playtime_tables.currsize)} / {_mb(playtime_tables.maxsize)}"
+            + f" ({len(playtime_tables):,} users)",
+            f"Render cache: {_mb(render_cache_size())} / {_mb(DISCORD_RENDER_CACHE_MAX_BYTES)}",
+        ]
+        if isinstance(shared_backend, InProcessBackend):
+            lines.append(f"Response cache (in memory): {_mb(shared_backend.size)} / {_mb(shared_backend.max_bytes)}")
+
+        lines.extend(
+            [
+                f"Cached messages: {len(self.bot.cached_messages):,}",
+                f"Cached members: {sum(len(guild.members) for guild in self.bot.guilds):,}",
+                f"Live paginators: {count_live_paginators():,}",
+            ]
+        )
+        await ctx.send("\n".join(lines))
@@ -0,0 +1,99 @@
+from logging import getLogger
+
+from discord import Embed
+from discord.ext import commands
+from discord.ext.commands import Context, command
+
+from ....models.bots import DiscordCogBase
+from ....models.exceptions import UserNotSetupException
+from ....services.playtime import get_playtime_table
+from ....services.steam import SteamUserService
+from .. import db, require_setup_user
+from ..utils import EMBED_FIELD_VALUE_MAX_LENGTH
+
+logger = getLogger("playtime")
+
+MAX_TOP_GAMES = 25
+MAX_GAME_NAME_LENGTH = 30
+
+
+def _hours(minutes: int) -> str:
+    return f"{minutes / 60:,.1f} hrs"
+
+
+def _most_played_lines(most_played: list[tuple[str, int]]) -> list[str]:
+    """Number the games, stopping before the lines would overflow an embed field"""
+
+    lines: list[str] = []
+    length = 0
+    for i, (name, minutes) in enumerate(most_played, start=1):
+        if len(name) > MAX_GAME_NAME_LENGTH:
+            name = name[: MAX_GAME_NAME_LENGTH - 1] + "…"
+
+        line = f"{i}. {name} - {_hours(minutes)}"
+        length += len(line) + (1 if lines else 0)
+        if length > EMBED_FIELD_VALUE_MAX_LENGTH:
+            break
+
+        lines.append(line)
+
+    return lines
+
+
+class Playtime(DiscordCogBase):
+    @command()
+    @require_setup_user()
+    async def playtime(
+        self,
+        ctx: Context,
+        top: int = commands.parameter(default=10, description="How many of your most played games to show"),
+    ):
+        """Show your total playtime, split by platform, and your most played games"""
+
+        top = min(max(top, 1), MAX_TOP_GAMES)
+
+        user = db.get_user(ctx.author.id)
+        if not (user and user.steam_api_key and user.steam_id_64):
+            return
+
+        table = await get_playtime_table(SteamUserService(user.steam_api_key), user.steam_id_64)
+        if not len(table):
+            await ctx.send("You don't own any games")
+            return
+
+        # Total: 1,234.5 hrs across 812 games (120 never played)
+        total = table.total
+        embed = Embed(
+            title="Your Playtime",
+            description=f"Total: {_hours(total)} across {len(table):,} games ({table.never_played:,} never played)",
+        )
+
+        # Windows: 1,000.0 hrs (81.0%)
+        embed.add_field(
+            name="Platforms",
+            value="\n".join(
+                f"{platform}: {_hours(minutes)}" + (f" ({minutes / total * 100:.1f}%)" if total else "")
+                for platform, minutes in table.platform_totals.items()
+            ),
+            inline=False,
+        )
+
+        # 1. Half-Life 2 - 52.3 hrs
+        if most_played := table.top(top):
+            embed.add_field(
+                name="Most Played",
+                value="\n".join(_most_played_lines(most_played)),
+                inline=False,
+            )
+
+        await ctx.send(embed=embed)
+
+    @playtime.error
+    async def playtime_error(self, ctx: Context, ex: Exception):
+        if isinstance(ex, UserNotSetupException):
+            # require_setup_user already handles this
+            return
+
+        logger.exception(f"{ctx.command} failed for user {ctx.author.id}", exc_info=ex)
+        await ctx.send("Oops, something went wrong!")
+        return
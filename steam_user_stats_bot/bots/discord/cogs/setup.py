@@ -10,8 +10,10 @@ from ....models.exceptions import (
     InvalidSteamKeyException,
     UserNotSetupException,
 )
+from ....services.refresh import refresh_scheduler
 from ....services.steam import SteamUserService
 from .. import db, require_setup_user
+from ..profiling import stage
 
 
 class Setup(DiscordCogBase):
@@ -48,6 +50,9 @@ class Setup(DiscordCogBase):
         else:
             db.create_user(user)
 
+        # warm their data before they run their first command
+        refresh_scheduler.prioritize(user.id)
+
         # TODO: add "Try running XXX"
         await ctx.send("Thanks, you're all set!")
 
@@ -101,12 +106,14 @@ class Setup(DiscordCogBase):
     async def get_profile_url(self, ctx: Context):
         """Look up your on Steam profile URL"""
 
-        user = db.get_user(ctx.author.id)
+        with stage("db"):
+            user = db.get_user(ctx.author.id)
         if not (user and user.steam_api_key and user.steam_id_64):
             return
 
         steam = SteamUserService(user.steam_api_key)
-        steam_user = await steam.get_user_summary(user.steam_id_64)
+        with stage("user_summary"):
+            steam_user = await steam.get_user_summary(user.steam_id_64)
         if not steam_user:
             await ctx.send(f"User not found. Try running `{DISCORD_BOT_PREFIX}setup` again")
             return
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import resource
+import time
+from collections import deque
+from logging import getLogger
+
+logger = getLogger("event_loop_monitor")
+
+
+class EventLoopLagMonitor:
+    """
+    Periodically sleeps on the event loop and measures how late it wakes up. Lag means
+    something is blocking the loop (i.e. synchronous work in a coroutine)
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.25, max_samples: int = 3600) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self.samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+        """(wall clock time, lag in seconds) pairs, oldest first"""
+
+        self._task: asyncio.Task | None = None
+
+    @property
+    def max_lag(self) -> float:
+        return max((lag for _, lag in self.samples), default=0)
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0)
+
+            self.samples.append((time.time(), lag))
+            if lag > self.threshold:
+                logger.warning(f"Event loop was blocked for {lag:.3f}s (threshold {self.threshold:.3f}s)")
+
+
+def current_rss_bytes() -> int:
+    """The process's resident set size, falling back to its peak RSS where /proc isn't available"""
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,113 @@
+import cProfile
+import json
+import os
+import random
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from logging import getLogger
+from typing import ContextManager, Generator
+
+from discord.ext.commands import Context
+
+from ...config import (
+    PROFILING_COMMANDS,
+    PROFILING_OUTPUT_DIR,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_SLOW_COMMAND_THRESHOLD,
+)
+
+logger = getLogger("profiling")
+
+_NULL_STAGE = nullcontext()
+_current_profile: ContextVar["CommandProfile | None"] = ContextVar("current_profile", default=None)
+_profiler_in_use = False
+
+
+class CommandProfile:
+    """Stage timings, and optionally a full cProfile, of a single command invocation"""
+
+    def __init__(self, command_name: str, full_profile: bool = False) -> None:
+        self.command_name = command_name
+        self.started_at = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.profiler = cProfile.Profile() if full_profile else None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @contextmanager
+    def stage(self, name: str) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + time.perf_counter() - start
+
+    def write(self, output_dir: str) -> str:
+        """Write the stage timings (and cProfile stats, if any) to disk, returning the base path"""
+
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        path = os.path.join(output_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{self.command_name}")
+        with open(f"{path}.json", "w") as f:
+            json.dump({"command": self.command_name, "elapsed": self.elapsed, "stages": self.stages}, f, indent=2)
+
+        if self.profiler:
+            self.profiler.dump_stats(f"{path}.prof")
+
+        return path
+
+
+def stage(name: str) -> ContextManager:
+    """
+    Time a stage of the current command, e.g. `with stage("owned_games"): ...`
+
+    This is a no-op unless the command is being profiled
+    """
+
+    if (profile := _current_profile.get()) is None:
+        return _NULL_STAGE
+
+    return profile.stage(name)
+
+
+async def before_invoke(ctx: Context) -> None:
+    global _profiler_in_use
+
+    if not ctx.command or (PROFILING_COMMANDS and ctx.command.name not in PROFILING_COMMANDS):
+        return
+
+    # only one cProfile can run at a time, and it sees everything else running on the event loop
+    full_profile = not _profiler_in_use and random.random() < PROFILING_SAMPLE_RATE
+    profile = CommandProfile(ctx.command.name, full_profile=full_profile)
+    _current_profile.set(profile)
+
+    if profile.profiler:
+        _profiler_in_use = True
+        profile.profiler.enable()
+
+
+async def after_invoke(ctx: Context) -> None:
+    global _profiler_in_use
+
+    if (profile := _current_profile.get()) is None:
+        return
+
+    _current_profile.set(None)
+    if profile.profiler:
+        profile.profiler.disable()
+        _profiler_in_use = False
+
+    stages = ", ".join(f"{name}={duration:.3f}s" for name, duration in profile.stages.items())
+    logger.debug(f"{profile.command_name} took {profile.elapsed:.3f}s ({stages})")
+    if profile.elapsed < PROFILING_SLOW_COMMAND_THRESHOLD:
+        return
+
+    path = profile.write(PROFILING_OUTPUT_DIR)
+    logger.warning(
+        f"Slow command {profile.command_name} took {profile.elapsed:.3f}s ({stages}); profile saved to {path}"
+    )
@@ -0,0 +1,113 @@
+import threading
+
+from ...config import DISCORD_RENDER_CACHE_MAX_BYTES
+from ...models.steam import SteamUserGameStatsAchievement
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+# templates are compiled once into bound `format` methods
+_game_header = "[{}]\n-----\n".format
+_achieved_on = "Achieved {} {:02d}, {}".format
+_global_percent = "\n{:.1f}% of players have this achievement".format
+_block = "```{}{}{}\n\n{}{}```".format
+"""game header, name, description, achieved status, global percent"""
+
+_RENDER_OVERHEAD = 300
+"""Approximate size in bytes of a cached render's key, string, and dict slot, not counting its text"""
+
+_render_cache: dict[tuple, str] = {}
+_previous_render_cache: dict[tuple, str] = {}
+"""
+Rendered achievements are cached in two generations: when the current one fills up, it replaces the previous one,
+and renders which are still in use are copied forward as they're read. This approximates an LRU cache, but hits are
+plain dict reads, which matters when a hit is only a few times cheaper than a render
+"""
+_render_cache_bytes = 0
+_previous_render_cache_bytes = 0
+"""Approximate size of each generation in bytes; together they stay under `DISCORD_RENDER_CACHE_MAX_BYTES`"""
+_render_lock = threading.Lock()
+"""Rendering can run in offload threads, so starting a new generation is serialized"""
+
+
+def _render(achievement: SteamUserGameStatsAchievement, include_game: bool) -> str:
+    # HALF-LIFE 2
+    # -----
+    # Lambda Locator
+    # Find all lambda caches in Half-Life 2.
+    #
+    # Achieved Nov 16, 2004
+    # 3.3% of players have this achievement
+    if not achievement.achieved:
+        status = "Not Achieved"
+    elif achieved_at := achievement.achieved_at:
+        status = _achieved_on(_MONTHS[achieved_at.month - 1], achieved_at.day, achieved_at.year)
+    else:
+        status = "Achieved"
+
+    return _block(
+        _game_header(achievement.game_name.upper()) if include_game else "",
+        achievement.display_name or achievement.api_name,
+        f"\n{achievement.description}" if achievement.description else "",
+        status,
+        _global_percent(achievement.global_percent) if achievement.global_percent is not None else "",
+    )
+
+
+def render_achievement(achievement: SteamUserGameStatsAchievement, include_game: bool = True) -> str:
+    """Render an achievement as a code block, reusing earlier renders of the same achievement"""
+
+    if achievement.app_id is None:
+        # api names are only unique within a game
+        return _render(achievement, include_game)
+
+    key = (
+        achievement.app_id,
+        achievement.api_name,
+        achievement.achieved,
+        achievement.achieved_at,
+        achievement.global_percent,
+        include_game,
+    )
+    if (rendered := _render_cache.get(key)) is None:
+        if (rendered := _previous_render_cache.get(key)) is None:
+            rendered = _render(achievement, include_game)
+
+        _cache_render(key, rendered)
+
+    return rendered
+
+
+def _cache_render(key: tuple, rendered: str) -> None:
+    global _render_cache, _previous_render_cache, _render_cache_bytes, _previous_render_cache_bytes
+
+    # single dict writes are atomic, so only starting a new generation needs the lock; the byte count is
+    # approximate anyway, so an increment lost to another thread doesn't matter
+    cache = _render_cache
+    cache[key] = rendered
+    _render_cache_bytes += _RENDER_OVERHEAD + len(rendered)
+    if _render_cache_bytes >= DISCORD_RENDER_CACHE_MAX_BYTES // 2:
+        with _render_lock:
+            if cache is _render_cache:
+                _previous_render_cache, _render_cache = _render_cache, {}
+                _previous_render_cache_bytes, _render_cache_bytes = _render_cache_bytes, 0
+
+
+def render_achievement_pages(achievements: list[SteamUserGameStatsAchievement], page_size: int) -> list[str]:
+    return [
+        "\n".join([render_achievement(achievement) for achievement in achievements[i : i + page_size]])
+        for i in range(0, len(achievements), page_size)
+    ]
+
+
+def render_cache_size() -> int:
+    """Approximate size of the cached renders in bytes"""
+    return _render_cache_bytes + _previous_render_cache_bytes
+
+
+def clear_render_cache() -> None:
+    global _render_cache_bytes, _previous_render_cache_bytes
+
+    with _render_lock:
+        _render_cache.clear()
+        _previous_render_cache.clear()
+        _render_cache_bytes = _previous_render_cache_bytes = 0
@@ -1,20 +1,24 @@
-from typing import Generator, TypeVar
+import weakref
 
-T = TypeVar("T")
+import Paginator  # type: ignore
+from discord import Embed
+from discord.ext.commands import Context
 
+from ...config import DISCORD_PAGINATOR_TIMEOUT
 
-def chunk_list(l: list[T], chunk_size: int) -> Generator[list[T], list[T], None]:
-    """Break a list into smaller list of size `chunk_size`"""
-    for i in range(0, len(l), chunk_size):
-        yield l[i : i + chunk_size]
+MESSAGE_MAX_LENGTH = 2000
+EMBED_DESCRIPTION_MAX_LENGTH = 4096
+EMBED_FIELD_VALUE_MAX_LENGTH = 1024
 
+_paginators: weakref.WeakSet[Paginator.Simple] = weakref.WeakSet()
 
-def consolidate_message_parts(parts: list[str], sep: str = "\n", max_length: int = 2000) -> list[str]:
+
+def consolidate_message_parts(parts: list[str], sep: str = "\n", max_length: int = MESSAGE_MAX_LENGTH) -> list[str]:
     """
     Combines multiple parts of a message into the largest message possible without exceeding the max length
 
     Args:
-        parts (list[str]): list of parts (if a single part it longer than the max length, it will be broken in two)
+        parts (list[str]): list of parts (if a single part it longer than the max length, it will be broken up)
         sep (str): the separator to combine parts
         max_length (int): the max length of a single combined part
 
@@ -23,34 +27,52 @@ def consolidate_message_parts(parts: list[str], sep: str = "\n", max_length: int
     """
 
     consolidated_parts: list[str] = []
-
-    consolidated_part_len = 0
     components: list[str] = []
+    length = 0
+    """Length of the components joined by `sep`"""
+
     for part in parts:
-        # split up large parts
+        # split up large parts, and carry the remainder into the next consolidated part
         if len(part) > max_length:
-            sub_part = part
-            while len(sub_part) > max_length:
-                consolidated_parts.append(sub_part[:max_length])
-                sub_part = sub_part[max_length:]
+            if components:
+                consolidated_parts.append(sep.join(components))
 
-            consolidated_parts.append(sub_part)
-            continue
+            cut = len(part) - (len(part) % max_length or max_length)
+            consolidated_parts.extend(part[i : i + max_length] for i in range(0, cut, max_length))
+            part = part[cut:]
+            components, length = [], 0
 
-        # build consolidated_part and track length
-        components.append(part)
-        consolidated_part_len += len(part)
+        added_length = len(part) + (len(sep) if components else 0)
+        if components and length + added_length > max_length:
+            consolidated_parts.append(sep.join(components))
+            components, length, added_length = [], 0, len(part)
 
-        # combine components into a consolidated part
-        if consolidated_part_len + (len(sep) * (len(components) - 1)) > max_length:
-            consolidated_part = sep.join(components[:-1])
-            consolidated_parts.append(consolidated_part)
-
-            components = []
-            consolidated_part_len = 0
+        components.append(part)
+        length += added_length
 
-    # add remaining parts
     if components:
         consolidated_parts.append(sep.join(components))
 
     return consolidated_parts
+
+
+def pack_embeds(title: str, parts: list[str], sep: str = "\n") -> list[Embed]:
+    """Combine parts into as few embeds as possible"""
+
+    return [
+        Embed(title=title, description=description)
+        for description in consolidate_message_parts(parts, sep=sep, max_length=EMBED_DESCRIPTION_MAX_LENGTH)
+    ]
+
+
+async def start_paginator(ctx: Context, pages: list[Embed]) -> None:
+    """Send paginated embeds, tracking the paginator so live sessions can be counted"""
+
+    paginator = Paginator.Simple(timeout=DISCORD_PAGINATOR_TIMEOUT)
+    _paginators.add(paginator)
+    await paginator.start(ctx, pages=pages)
+
+
+def count_live_paginators() -> int:
+    """Count paginators which haven't timed out yet, since each one keeps its pages in memory"""
+    return sum(1 for paginator in _paginators if not paginator.is_finished())
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from logging import getLogger
+from urllib.parse import urlencode
+
+from httpx import AsyncBaseTransport, AsyncHTTPTransport, Request, Response
+
+from ..config import (
+    STEAM_CACHE_TTL,
+    STEAM_FRIEND_LIST_CACHE_TTL,
+    STEAM_PRESENCE_CACHE_TTL,
+    STEAM_SCHEMA_CACHE_TTL,
+)
+
+logger = getLogger("steam_response_cache")
+
+ENDPOINT_TTLS: dict[str, int] = {
+    "/IPlayerService/GetOwnedGames/v0001": STEAM_CACHE_TTL,
+    "/IPlayerService/GetTopAchievementsForGames/v1": STEAM_CACHE_TTL,
+    "/ISteamUser/GetFriendList/v0001": STEAM_FRIEND_LIST_CACHE_TTL,
+    "/ISteamUser/GetPlayerSummaries/v0002": STEAM_PRESENCE_CACHE_TTL,
+    "/ISteamUser/ResolveVanityURL/v0001": 60 * 60 * 24,
+    "/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002": 60 * 60 * 24,
+    "/ISteamUserStats/GetPlayerAchievements/v0001": STEAM_CACHE_TTL,
+    "/ISteamUserStats/GetSchemaForGame/v2": STEAM_SCHEMA_CACHE_TTL,
+}
+"""Cache TTL in seconds for each endpoint; endpoints not listed here are never cached"""
+
+PUBLIC_ENDPOINTS: set[str] = {
+    "/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002",
+    "/ISteamUserStats/GetSchemaForGame/v2",
+}
+"""Endpoints which return the same data regardless of API key, so responses can be shared between keys"""
+
+
+def cache_key(endpoint: str, params: list[tuple[str, str]]) -> str:
+    """Build a cache key from a request's endpoint and params, including its API key (as `key`)"""
+
+    params = sorted(params)
+    if endpoint in PUBLIC_ENDPOINTS:
+        params = [(k, v) for k, v in params if k != "key"]
+    else:
+        # never store raw API keys
+        params = [(k, hashlib.sha256(v.encode()).hexdigest() if k == "key" else v) for k, v in params]
+
+    return f"{endpoint}?{urlencode(params)}"
+
+
+class SteamResponseCache:
+    """Size-capped store of zlib-compressed response bodies, backed by SQLite and evicted least recently used first"""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        if (cache_dir := os.path.dirname(path)) and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, last_accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_response_last_accessed ON response (last_accessed)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored bodies in bytes"""
+        return self._size
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._size, "max_bytes": self.max_bytes}
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT body, expires_at FROM response WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                self._conn.execute("UPDATE response SET last_accessed = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return zlib.decompress(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, body: bytes, ttl: int) -> None:
+        compressed = zlib.compress(body)
+        if len(compressed) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            if existing := self._conn.execute("SELECT size FROM response WHERE key = ?", (key,)).fetchone():
+                self._size -= existing[0]
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response (key, body, size, expires_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), now + ttl, now),
+            )
+            self._size += len(compressed)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Remove expired responses, then the least recently used ones until we're under the size cap"""
+
+        self._conn.execute("DELETE FROM response WHERE expires_at <= ?", (time.time(),))
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response").fetchone()[0]
+        while self._size > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM response ORDER BY last_accessed LIMIT 100").fetchall()
+            if not rows:
+                break
+
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+
+                self._conn.execute("DELETE FROM response WHERE key = ?", (key,))
+                self._size -= size
+
+
+class CachedSteamTransport(AsyncBaseTransport):
+    """Serves cacheable Steam API GET requests from a `SteamResponseCache` before hitting the network"""
+
+    def __init__(self, cache: SteamResponseCache, transport: AsyncBaseTransport | None = None) -> None:
+        self.cache = cache
+        self.transport = transport or AsyncHTTPTransport()
+
+    @classmethod
+    def cache_key(cls, request: Request) -> str:
+        return cache_key(request.url.path, request.url.params.multi_items())
+
+    async def handle_async_request(self, request: Request) -> Response:
+        ttl = ENDPOINT_TTLS.get(request.url.path)
+        if request.method != "GET" or ttl is None:
+            return await self.transport.handle_async_request(request)
+
+        key = self.cache_key(request)
+        use_cache = request.headers.get("Cache-Control") != "no-cache"
+        if use_cache and (body := await asyncio.to_thread(self.cache.get, key)) is not None:
+            logger.debug(f"Cache hit: {request.url.path}")
+            return Response(200, headers={"content-type": "application/json"}, content=body)
+
+        response = await self.transport.handle_async_request(request)
+        if response.status_code != 200:
+            return response
+
+        # read the (decoded) body so we can store it and hand back a fresh response
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+
+        await asyncio.to_thread(self.cache.set, key, body, ttl)
+        return Response(
+            200, headers={"content-type": response.headers.get("content-type", "application/json")}, content=body
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
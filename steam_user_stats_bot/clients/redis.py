@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any
+from urllib.parse import urlparse
+
+from ..models.exceptions import SharedBackendException, SharedBackendUnavailableException
+
+RESPValue = bytes | int | list | None
+
+
+class RedisClient:
+    """
+    Minimal asyncio client for the Redis serialization protocol (RESP2)
+
+    Works against Redis, or anything speaking its protocol (e.g. Valkey, KeyDB, or a local stand-in for testing)
+    """
+
+    def __init__(
+        self, url: str = "redis://localhost:6379/0", max_connections: int = 10, connect_timeout: float = 5.0
+    ) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.connect_timeout = connect_timeout
+
+        self._pool: asyncio.LifoQueue[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = asyncio.LifoQueue()
+        self._connections = asyncio.Semaphore(max_connections)
+
+    async def _connect(self) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), timeout=self.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            raise SharedBackendUnavailableException(f"Unable to connect to Redis at {self.host}:{self.port}", str(e))
+
+        try:
+            if self.password:
+                await self._send(reader, writer, "AUTH", self.password)
+            if self.db:
+                await self._send(reader, writer, "SELECT", self.db)
+
+        except (SharedBackendException, OSError, asyncio.IncompleteReadError) as e:
+            writer.close()
+            raise SharedBackendUnavailableException("Unable to set up Redis connection", str(e))
+        except asyncio.CancelledError:
+            writer.close()
+            raise
+
+        return reader, writer
+
+    @classmethod
+    def _encode(cls, *args: Any) -> bytes:
+        encoded = [arg if isinstance(arg, bytes) else str(arg).encode() for arg in args]
+        return b"".join([f"*{len(encoded)}\r\n".encode()] + [b"$%d\r\n%s\r\n" % (len(arg), arg) for arg in encoded])
+
+    @classmethod
+    async def _read(cls, reader: asyncio.StreamReader) -> RESPValue:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload
+        if prefix == b"-":
+            raise SharedBackendException("Redis error", payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            return None if length == -1 else (await reader.readexactly(length + 2))[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            return None if length == -1 else [await cls._read(reader) for _ in range(length)]
+
+        # we can't tell where the next response starts, so the connection can't be reused
+        raise ConnectionError(f"Invalid RESP response: {line.decode(errors='replace')}")
+
+    @classmethod
+    async def _send(cls, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, *args: Any) -> RESPValue:
+        writer.write(cls._encode(*args))
+        await writer.drain()
+        return await cls._read(reader)
+
+    async def execute(self, *args: Any) -> RESPValue:
+        """
+        Run a single command, e.g. `await client.execute("SET", "key", "value", "PX", 1000)`
+
+        Raises `SharedBackendException` for error replies, and `SharedBackendUnavailableException` if Redis can't be
+        reached
+        """
+
+        async with self._connections:
+            reader, writer = self._pool.get_nowait() if not self._pool.empty() else await self._connect()
+            try:
+                response = await self._send(reader, writer, *args)
+            except SharedBackendException:
+                # the whole error reply was read, so the connection can still be used
+                self._pool.put_nowait((reader, writer))
+                raise
+            except (OSError, asyncio.IncompleteReadError) as e:
+                writer.close()
+                raise SharedBackendUnavailableException("Lost connection to Redis", str(e))
+            except asyncio.CancelledError:
+                # the connection may be mid-response, so it can't be reused
+                writer.close()
+                raise
+
+            self._pool.put_nowait((reader, writer))
+            return response
+
+    async def close(self) -> None:
+        while not self._pool.empty():
+            _, writer = self._pool.get_nowait()
+            writer.close()
+            await writer.wait_closed()
@@ -1,11 +1,17 @@
+import asyncio
+import time
+from collections import deque
 from http import HTTPStatus
-from typing import Any, Callable
+from logging import getLogger
+from typing import Any, Awaitable, Callable
 
-from httpx import AsyncClient, HTTPStatusError, Response
+from httpx import AsyncBaseTransport, AsyncClient, AsyncHTTPTransport, HTTPStatusError, Request, Response
 
 from ..config import STEAM_WEB_API_BASE_URL
 from ..models.exceptions import InvalidResponseException, InvalidSteamKeyException
 
+logger = getLogger("steam_client")
+
 
 class SteamWebAPI(AsyncClient):
     def __init__(self, api_key: str, format: str = "json", timeout: float = 5, **kwargs):
@@ -66,3 +72,156 @@ class SteamWebAPI(AsyncClient):
         except HTTPStatusError as e:
             await response.aread()
             raise InvalidResponseException(detail=e.response.content.decode()) from e
+
+
+class RateLimitedTransport(AsyncBaseTransport):
+    """Waits on `acquire` (e.g. for a rate limit token) before sending each request over the network"""
+
+    def __init__(self, acquire: Callable[[], Awaitable[None]], transport: AsyncBaseTransport | None = None) -> None:
+        self.acquire = acquire
+        self.transport = transport or AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: Request) -> Response:
+        await self.acquire()
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class RequestHedger:
+    """
+    Tracks recent latencies for each endpoint, and decides when a slow request is worth sending again
+
+    Hedges are paid for out of a budget which earns `budget` hedges per request, up to `max_tokens`, so at most
+    roughly that fraction of extra requests are sent, even when Steam is slow across the board
+    """
+
+    def __init__(
+        self, budget: float, min_delay: float, window: int = 200, min_samples: int = 20, max_tokens: float = 100
+    ) -> None:
+        self.budget = budget
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.max_tokens = max_tokens
+
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+        self._latencies: dict[str, deque[float]] = {}
+        self._tokens = max_tokens
+
+    def record(self, endpoint: str, latency: float) -> None:
+        self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(latency)
+
+    def p95(self, endpoint: str) -> float | None:
+        """The endpoint's 95th percentile latency in seconds, or None if there aren't enough samples yet"""
+
+        latencies = self._latencies.get(endpoint)
+        if not latencies or len(latencies) < self.min_samples:
+            return None
+
+        return sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+
+    def hedge_delay(self, endpoint: str) -> float | None:
+        """
+        How long to wait on a new request before hedging it, or None if it shouldn't be hedged
+
+        Called once per request, which also earns the budget for future hedges
+        """
+
+        self._tokens = min(self.max_tokens, self._tokens + self.budget)
+        if (p95 := self.p95(endpoint)) is None:
+            return None
+
+        return max(p95, self.min_delay)
+
+    def take_hedge(self) -> bool:
+        if self._tokens < 1:
+            return False
+
+        self._tokens -= 1
+        self.hedges_sent += 1
+        return True
+
+
+class HedgedTransport(AsyncBaseTransport):
+    """
+    Sends a duplicate of a GET request which is slower than its endpoint's p95 latency, and returns whichever
+    response arrives first
+
+    Sits below any rate limiting, so time spent waiting for a token isn't mistaken for a slow response; duplicates
+    wait on `acquire` for a token of their own before they're sent
+    """
+
+    def __init__(
+        self,
+        hedger: RequestHedger,
+        transport: AsyncBaseTransport | None = None,
+        acquire: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self.hedger = hedger
+        self.transport = transport or AsyncHTTPTransport()
+        self.acquire = acquire
+
+    async def _send(self, request: Request, is_hedge: bool = False) -> Response:
+        if is_hedge and self.acquire:
+            await self.acquire()
+
+        start = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+
+            # read the (decoded) body so the slower response can be discarded without leaking its connection
+            try:
+                body = await response.aread()
+            finally:
+                await response.aclose()
+
+        except asyncio.CancelledError:
+            # a cancelled primary (e.g. one whose hedge won) took at least this long, and leaving it out would
+            # skew the p95 towards fast responses
+            if not is_hedge:
+                self.hedger.record(request.url.path, time.monotonic() - start)
+            raise
+
+        self.hedger.record(request.url.path, time.monotonic() - start)
+        return Response(
+            response.status_code,
+            headers={"content-type": response.headers.get("content-type", "application/json")},
+            content=body,
+        )
+
+    async def handle_async_request(self, request: Request) -> Response:
+        if request.method != "GET":
+            return await self.transport.handle_async_request(request)
+
+        delay = self.hedger.hedge_delay(request.url.path)
+        primary = asyncio.create_task(self._send(request))
+        pending = {primary}
+        try:
+            if delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=delay)
+                if not done and self.hedger.take_hedge():
+                    logger.debug(f"Hedging slow request: {request.url.path}")
+                    pending.add(asyncio.create_task(self._send(request, is_hedge=True)))
+
+            # take the first successful response; if every attempt fails, raise the first attempt's error
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedger.hedges_won += 1
+
+                        return task.result()
+
+            return primary.result()
+
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
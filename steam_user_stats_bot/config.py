@@ -22,16 +22,139 @@ def _load(env_var_name: str, default: T, func: Callable[[str], T]) -> T:
         return default
 
 
+def _bool(val: str) -> bool:
+    if val.lower() in ["true", "1", "yes"]:
+        return True
+    if val.lower() in ["false", "0", "no"]:
+        return False
+
+    raise ValueError(f"{val} is not a boolean")
+
+
 DB_DIR = _load("DB_DIR", "data/statsbot.db", str)
 DB_URL = f"sqlite+pysqlite:///{DB_DIR}"
 
-STEAM_WEB_API_BASE_URL = "http://api.steampowered.com"
+LOW_MEMORY_MODE = _load("LOW_MEMORY_MODE", False, _bool)
+"""Run with minimal Discord intents and caches, and smaller default cache sizes"""
+
+STEAM_WEB_API_BASE_URL = _load("STEAM_WEB_API_BASE_URL", "http://api.steampowered.com", str)
 STEAM_CACHE_TTL = _load("STEAM_CACHE_TTL", 60 * 30, int)
 """Cache TTL in seconds"""
+STEAM_PRESENCE_CACHE_TTL = _load("STEAM_PRESENCE_CACHE_TTL", 60, int)
+"""Player summary (online status) cache TTL in seconds"""
+STEAM_FRIEND_LIST_CACHE_TTL = _load("STEAM_FRIEND_LIST_CACHE_TTL", 60 * 60, int)
+"""Friend list cache TTL in seconds"""
+STEAM_SCHEMA_CACHE_TTL = _load("STEAM_SCHEMA_CACHE_TTL", 60 * 60 * 24 * 7, int)
+"""Persisted achievement schema TTL in seconds"""
+STEAM_SCHEMA_MEMORY_CACHE_MAX_BYTES = _load(
+    "STEAM_SCHEMA_MEMORY_CACHE_MAX_BYTES", (4 if LOW_MEMORY_MODE else 32) * 1024 * 1024, int
+)
+"""Approximate max size in bytes of achievement schemas kept in memory, on top of the database"""
+STEAM_PLAYTIME_TABLE_CACHE_MAX_BYTES = _load(
+    "STEAM_PLAYTIME_TABLE_CACHE_MAX_BYTES", (2 if LOW_MEMORY_MODE else 16) * 1024 * 1024, int
+)
+"""Approximate max size in bytes of users' playtime tables kept in memory"""
+STEAM_RESPONSE_CACHE_ENABLED = _load("STEAM_RESPONSE_CACHE_ENABLED", False, _bool)
+"""Persist Steam API responses on disk, so they survive restarts"""
+STEAM_RESPONSE_CACHE_DIR = _load(
+    "STEAM_RESPONSE_CACHE_DIR", os.path.join(os.path.dirname(DB_DIR), "steam_cache.db"), str
+)
+STEAM_RESPONSE_CACHE_MAX_BYTES = _load("STEAM_RESPONSE_CACHE_MAX_BYTES", 256 * 1024 * 1024, int)
+"""Max size of the compressed response cache in bytes; least recently used responses are evicted first"""
+RARITY_SNAPSHOT_ENABLED = _load("RARITY_SNAPSHOT_ENABLED", False, _bool)
+"""
+Serve global achievement percentages from a memory-mapped snapshot file shared by every bot process
+
+Rebuilds are serialized with a lock from the shared backend. Without `SHARED_BACKEND_URL` that lock only covers this
+process, so bot processes sharing a snapshot can overwrite each other's newly fetched games (which are then fetched
+again once they're needed)
+"""
+RARITY_SNAPSHOT_PATH = _load("RARITY_SNAPSHOT_PATH", os.path.join(os.path.dirname(DB_DIR), "global_rarity.bin"), str)
+RARITY_SNAPSHOT_REBUILD_INTERVAL = _load("RARITY_SNAPSHOT_REBUILD_INTERVAL", 600.0, float)
+"""How often to add newly fetched games to the rarity snapshot, in seconds"""
+RARITY_SNAPSHOT_MAX_AGE = _load("RARITY_SNAPSHOT_MAX_AGE", 86400.0, float)
+"""How long a game's global percentages are served from the rarity snapshot before they're fetched again, in seconds"""
 STEAM_DEFAULT_REQUEST_TIMEOUT = _load("STEAM_DEFAULT_REQUEST_TIMEOUT", 10.0, float)
 """HTTPX Timeout in seconds"""
+STEAM_HEDGE_REQUESTS = _load("STEAM_HEDGE_REQUESTS", False, _bool)
+"""Send a duplicate of Steam API requests which are slower than usual, and use whichever response arrives first"""
+STEAM_HEDGE_BUDGET = _load("STEAM_HEDGE_BUDGET", 0.05, float)
+"""Max fraction of Steam API requests which may be hedged with a duplicate"""
+STEAM_HEDGE_MIN_DELAY = _load("STEAM_HEDGE_MIN_DELAY", 0.1, float)
+"""Min time in seconds to wait on a request before hedging it"""
+STEAM_ACHIEVEMENT_FETCH_DEADLINE = _load("STEAM_ACHIEVEMENT_FETCH_DEADLINE", 20.0, float)
+"""Time budget in seconds for fetching a user's achievements before returning partial results"""
+STEAM_ACHIEVEMENT_FETCH_MODE = _load("STEAM_ACHIEVEMENT_FETCH_MODE", "per_app", str)
+"""
+How to fetch users' achievements: "per_app" requests each game separately, while "batched" requests many games at
+once, but only returns unlocked achievements, without unlock times
+"""
+STEAM_ACHIEVEMENT_BATCH_SIZE = _load("STEAM_ACHIEVEMENT_BATCH_SIZE", 50, int)
+"""Max number of games to request at once when fetching achievements in batches"""
+STEAM_MAX_CONCURRENT_REQUESTS = _load("STEAM_MAX_CONCURRENT_REQUESTS", 50, int)
+"""Max Steam API requests in flight at once across all commands and background jobs in this process"""
+STEAM_RATE_LIMIT_PER_SECOND = _load("STEAM_RATE_LIMIT_PER_SECOND", 0.0, float)
+"""Max sustained Steam API requests per second for each API key, shared between bot processes; 0 disables it"""
+STEAM_RATE_LIMIT_BURST = _load("STEAM_RATE_LIMIT_BURST", 50, int)
+"""Max Steam API requests each API key can burst to before being held to the rate limit"""
+
+SHARED_BACKEND_URL = _load("SHARED_BACKEND_URL", "", str)
+"""
+Where caches, locks, and rate limits are shared between bot processes, e.g. `redis://localhost:6379/0`
+
+Leave empty to keep them in this process
+"""
+SHARED_BACKEND_MAX_BYTES = _load("SHARED_BACKEND_MAX_BYTES", (8 if LOW_MEMORY_MODE else 64) * 1024 * 1024, int)
+"""Max size of the in-process backend's cache in bytes"""
+
+CPU_OFFLOAD_EXECUTOR = _load("CPU_OFFLOAD_EXECUTOR", "thread", str)
+"""Where to run CPU-heavy parsing, ranking, and rendering: "thread", "process", or "none" for the event loop"""
+CPU_OFFLOAD_THRESHOLD = _load("CPU_OFFLOAD_THRESHOLD", 1000, int)
+"""Payloads with at least this many achievements are offloaded from the event loop"""
+CPU_OFFLOAD_MAX_WORKERS = _load("CPU_OFFLOAD_MAX_WORKERS", 2, int)
+
+BACKGROUND_REFRESH_ENABLED = _load("BACKGROUND_REFRESH_ENABLED", False, _bool)
+"""Refresh set-up users' Steam data in the background, so their commands are served from cache"""
+BACKGROUND_REFRESH_INTERVAL = _load("BACKGROUND_REFRESH_INTERVAL", 600.0, float)
+"""Time between refresh cycles in seconds"""
+BACKGROUND_REFRESH_JITTER = _load("BACKGROUND_REFRESH_JITTER", 5.0, float)
+"""Max random delay in seconds added between refreshes"""
+BACKGROUND_REFRESH_REQUEST_BUDGET = _load("BACKGROUND_REFRESH_REQUEST_BUDGET", 2000, int)
+"""Approximate max number of Steam requests per refresh cycle"""
+
+NOTIFICATIONS_MIN_POLL_INTERVAL = _load("NOTIFICATIONS_MIN_POLL_INTERVAL", 120.0, float)
+"""How often to check active users for new achievement unlocks, in seconds"""
+NOTIFICATIONS_MAX_POLL_INTERVAL = _load("NOTIFICATIONS_MAX_POLL_INTERVAL", 3600.0, float)
+"""How often to check inactive users for new achievement unlocks, in seconds"""
+NOTIFICATIONS_MAX_CONCURRENCY = _load("NOTIFICATIONS_MAX_CONCURRENCY", 5, int)
+"""Max number of users to check for new achievement unlocks at once"""
 
 DISCORD_BOT_PREFIX = _load("DISCORD_BOT_PREFIX", "$", str)
 DISCORD_ACHIEVEMENT_PAGE_SIZE = _load("DISCORD_ACHIEVEMENT_PAGE_SIZE", 6, int)
+DISCORD_RARE_ACHIEVEMENT_LIMIT = _load("DISCORD_RARE_ACHIEVEMENT_LIMIT", 30, int)
+"""Default number of achievements shown by check_rare_achievements"""
+DISCORD_RENDER_CACHE_MAX_BYTES = _load(
+    "DISCORD_RENDER_CACHE_MAX_BYTES", (1 if LOW_MEMORY_MODE else 8) * 1024 * 1024, int
+)
+"""Approximate max size in bytes of rendered achievements kept for reuse"""
 DISCORD_PAGINATOR_TIMEOUT = _load("DISCORD_PAGINATOR_TIMEOUT", 60, int)
 """Timeout in seconds"""
+DISCORD_MAX_MESSAGES = _load("DISCORD_MAX_MESSAGES", 100 if LOW_MEMORY_MODE else 1000, int)
+"""Max number of messages to keep in discord.py's message cache"""
+
+EVENT_LOOP_LAG_MONITOR_INTERVAL = _load("EVENT_LOOP_LAG_MONITOR_INTERVAL", 0.5, float)
+"""How often to check the event loop for lag, in seconds; set to 0 to disable the monitor"""
+EVENT_LOOP_LAG_THRESHOLD = _load("EVENT_LOOP_LAG_THRESHOLD", 0.25, float)
+"""Event loop lag in seconds above which a warning is logged"""
+
+PROFILING_ENABLED = _load("PROFILING_ENABLED", False, _bool)
+"""Record stage timings for bot commands, and write profiles of slow commands to disk"""
+PROFILING_SAMPLE_RATE = _load("PROFILING_SAMPLE_RATE", 0.1, float)
+"""Fraction of command invocations to fully profile with cProfile"""
+PROFILING_COMMANDS: list[str] = _load(
+    "PROFILING_COMMANDS", [], lambda x: [command.strip() for command in x.split(",") if command.strip()]
+)
+"""Commands to profile; if empty, all commands are profiled"""
+PROFILING_SLOW_COMMAND_THRESHOLD = _load("PROFILING_SLOW_COMMAND_THRESHOLD", 5.0, float)
+"""Commands slower than this (in seconds) have their profile written to disk"""
+PROFILING_OUTPUT_DIR = _load("PROFILING_OUTPUT_DIR", os.path.join(os.path.dirname(DB_DIR), "profiles"), str)
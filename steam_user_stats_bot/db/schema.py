@@ -23,3 +23,49 @@ class UserInDB(StatsBotDBBase):
     id: Mapped[str] = mapped_column(primary_key=True)
     steam_id_64: Mapped[str | None] = mapped_column(nullable=True)
     steam_api_key: Mapped[str | None] = mapped_column(nullable=True)
+
+
+class AchievementSchemaInDB(StatsBotDBBase):
+    __tablename__ = "achievement_schema"
+
+    app_id: Mapped[str] = mapped_column(primary_key=True)
+    language: Mapped[str] = mapped_column(primary_key=True)
+    api_name: Mapped[str] = mapped_column(primary_key=True)
+    display_name: Mapped[str | None] = mapped_column(nullable=True)
+    description: Mapped[str | None] = mapped_column(nullable=True)
+    hidden: Mapped[bool] = mapped_column(default=False)
+
+
+class NotificationSubscriptionInDB(StatsBotDBBase):
+    __tablename__ = "notification_subscription"
+
+    user_id: Mapped[str] = mapped_column(primary_key=True)
+    guild_id: Mapped[str]
+    channel_id: Mapped[str]
+
+
+class UserAchievementInDB(StatsBotDBBase):
+    """An achievement a user has unlocked, recorded whenever their achievements are fetched"""
+
+    __tablename__ = "user_achievement"
+
+    user_id: Mapped[str] = mapped_column(primary_key=True)
+    app_id: Mapped[str] = mapped_column(primary_key=True)
+    api_name: Mapped[str] = mapped_column(primary_key=True)
+    game_name: Mapped[str]
+    display_name: Mapped[str | None] = mapped_column(nullable=True)
+    achieved_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+    global_percent: Mapped[float | None] = mapped_column(nullable=True)
+    notified: Mapped[bool] = mapped_column(default=False)
+    """Whether the unlock notifier has seen this unlock"""
+
+
+class GuildMemberInDB(StatsBotDBBase):
+    """A user who has run a command in a guild, so guild-wide queries don't need to look up members from Discord"""
+
+    __tablename__ = "guild_member"
+
+    guild_id: Mapped[str] = mapped_column(primary_key=True)
+    user_id: Mapped[str] = mapped_column(primary_key=True)
+    display_name: Mapped[str]
+    """The member's display name as of their latest command in the guild"""
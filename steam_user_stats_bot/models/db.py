@@ -19,3 +19,26 @@ class User(UserIn):
     @property
     def is_setup(self):
         return all([self.steam_id_64, self.steam_api_key])
+
+
+class NotificationSubscription(StatsBotBaseModel):
+    user_id: str
+    guild_id: str
+    channel_id: str
+    created_at: datetime | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class UserAchievementUnlock(StatsBotBaseModel):
+    user_id: str
+    app_id: str
+    api_name: str
+    game_name: str
+    display_name: str | None = None
+    achieved_at: datetime | None = None
+    global_percent: float | None = None
+
+    class Config:
+        orm_mode = True
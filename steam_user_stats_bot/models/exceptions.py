@@ -39,6 +39,24 @@ class InvalidSteamKeyException(InvalidResponseException):
         super().__init__(message, detail)
 
 
+### Shared Backend ###
+
+
+class SharedBackendException(Exception):
+    """Raised when the shared backend (e.g. Redis) returns an error"""
+
+    def __init__(self, message: str | None = None, detail: str | None = None):
+        message = message or "Shared backend error"
+        if detail:
+            message += f" ({detail})"
+
+        super().__init__(message)
+
+
+class SharedBackendUnavailableException(SharedBackendException):
+    """Raised when the shared backend can't be reached"""
+
+
 ### Discord ###
 
 
@@ -35,6 +35,14 @@ class SteamUser(StatsBotBaseModel):
     last_online: datetime | None = Field(None, alias="lastlogoff")
     allows_comments: bool = Field(alias="commentpermission")
 
+    # only populated if the user is in game and their game details are visible
+    game_id: str | None = Field(None, alias="gameid")
+    game_name: str | None = Field(None, alias="gameextrainfo")
+
+    @property
+    def is_in_game(self) -> bool:
+        return bool(self.game_id)
+
     @root_validator(pre=True)
     def build_subclasses(cls, values: dict):
         values["avatar"] = SteamUserAvatar(**values)
@@ -53,13 +61,13 @@ class SteamUserGamePlaytime(StatsBotBaseModel):
     all_time: int = Field(alias="playtime_forever")
     """A User's total playtime, in minutes"""
 
-    all_time_windows: int = Field(alias="playtime_windows_forever")
+    all_time_windows: int = Field(0, alias="playtime_windows_forever")
     """A User's total playtime on a Windows platform, in minutes"""
 
-    all_time_mac: int = Field(alias="playtime_mac_forever")
+    all_time_mac: int = Field(0, alias="playtime_mac_forever")
     """A User's total playtime on a Mac platform, in minutes"""
 
-    all_time_linux: int = Field(alias="playtime_linux_forever")
+    all_time_linux: int = Field(0, alias="playtime_linux_forever")
     """A User's total playtime on a Linux platform, in minutes"""
 
 
@@ -90,6 +98,35 @@ class SteamUserGame(StatsBotBaseModel):
 
 
 ### Achievements ###
+class SteamGameSchemaAchievement(StatsBotBaseModel):
+    api_name: str = Field(alias="name")
+    display_name: str | None = Field(None, alias="displayName")
+    description: str | None = None
+    hidden: bool = False
+
+
+class SteamGameSchema(StatsBotBaseModel):
+    """The localized achievement schema of a game, which is the same for every player"""
+
+    app_id: str
+    language: str
+    achievements: list[SteamGameSchemaAchievement]
+    fetched_at: datetime = Field(default_factory=datetime.now)
+
+    @root_validator(pre=True)
+    def build_achievements(cls, values: dict):
+        if "availableGameStats" in values:
+            values["achievements"] = values.pop("availableGameStats").get("achievements", [])
+
+        values["achievements"] = [
+            achievement
+            if isinstance(achievement, SteamGameSchemaAchievement)
+            else SteamGameSchemaAchievement(**achievement)
+            for achievement in values.get("achievements", [])
+        ]
+        return values
+
+
 class SteamGlobalGameStatsAchievement(StatsBotBaseModel):
     api_name: str = Field(alias="name")
     percent: float
@@ -102,12 +139,16 @@ class SteamGlobalGameStats(StatsBotBaseModel):
     @root_validator(pre=True)
     def build_achievements(cls, values: dict):
         values["achievements"] = [
-            SteamGlobalGameStatsAchievement(**achievement) for achievement in values.pop("achievements", [])
+            achievement
+            if isinstance(achievement, SteamGlobalGameStatsAchievement)
+            else SteamGlobalGameStatsAchievement(**achievement)
+            for achievement in values.pop("achievements", [])
         ]
         return values
 
 
 class SteamUserGameStatsAchievement(StatsBotBaseModel):
+    app_id: str | None = None
     game_name: str
     api_name: str = Field(alias="apiname")
     display_name: str | None = Field(None, alias="name")
@@ -132,7 +173,77 @@ class SteamUserGameStats(StatsBotBaseModel):
     @root_validator(pre=True)
     def build_achievements(cls, values: dict):
         values["achievements"] = [
-            SteamUserGameStatsAchievement(**{"game_name": values["gameName"]} | achievement)
+            achievement
+            if isinstance(achievement, SteamUserGameStatsAchievement)
+            else SteamUserGameStatsAchievement(
+                **{"app_id": values.get("app_id"), "game_name": values["gameName"]} | achievement
+            )
             for achievement in values.pop("achievements", [])
         ]
         return values
+
+
+class SteamUserAchievementScan(StatsBotBaseModel):
+    """Achievement stats for a subset of a user's games, e.g. when a fetch hits its deadline"""
+
+    stats: list[SteamUserGameStats]
+    games_scanned: int
+    games_total: int
+    games_ruled_out: int = 0
+    """Games which weren't scanned because they couldn't have changed the result"""
+
+    @property
+    def is_complete(self) -> bool:
+        return self.games_scanned + self.games_ruled_out >= self.games_total
+
+    @property
+    def coverage(self) -> str:
+        coverage = f"scanned {self.games_scanned:,}/{self.games_total:,} games"
+        if self.games_ruled_out:
+            coverage += f", ruled out {self.games_ruled_out:,}"
+
+        return coverage
+
+
+class SteamGameCompletion(StatsBotBaseModel):
+    app_id: str
+    name: str
+    unlocked: int
+    total: int
+
+    @property
+    def percent(self) -> float:
+        return self.unlocked / self.total * 100 if self.total else 0
+
+
+class SteamUserReport(StatsBotBaseModel):
+    """Precomputed rarity and completion stats for a user"""
+
+    user_id: str
+    steam_id: str
+    generated_at: datetime
+    games_scanned: int
+    games_total: int
+
+    rarest: list[SteamUserGameStatsAchievement]
+    """The user's rarest unlocked achievements, rarest first"""
+    completion: list[SteamGameCompletion]
+    """Completion of each game with achievements, most complete first"""
+
+    @property
+    def average_completion(self) -> float:
+        """Average completion percent of games the user has started"""
+
+        started = [game.percent for game in self.completion if game.unlocked]
+        return sum(started) / len(started) if started else 0
+
+
+class SteamLibraryComparison(StatsBotBaseModel):
+    """Games two users share, and the achievements each has unlocked in them that the other hasn't"""
+
+    shared_games: list[SteamUserGame]
+    """Shared games, most played (by the first user) first"""
+    only_first: list[SteamUserGameStatsAchievement]
+    """Achievements only the first user has unlocked, rarest first"""
+    only_second: list[SteamUserGameStatsAchievement]
+    """Achievements only the second user has unlocked, rarest first"""
@@ -0,0 +1,292 @@
+import asyncio
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from logging import getLogger
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from cachetools import TLRUCache
+
+from ..clients.redis import RedisClient, RESPValue
+from ..config import SHARED_BACKEND_MAX_BYTES, SHARED_BACKEND_URL
+from ..models.exceptions import SharedBackendException, SharedBackendUnavailableException
+
+logger = getLogger("shared_backend")
+
+DEFAULT_LOCK_TTL = 30.0
+"""How long (in seconds) a lock is held before it's considered abandoned"""
+REDIS_RETRY_INTERVAL = 30.0
+"""How long (in seconds) to use the in-process fallback after Redis becomes unreachable, before trying it again"""
+
+
+class SharedStateBackend(ABC):
+    """
+    Caches, locks, and rate limits which can be shared between bot processes
+
+    Values are raw bytes, so callers decide how to serialize them
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def lock(self, key: str, ttl: float = DEFAULT_LOCK_TTL) -> AbstractAsyncContextManager[None]:
+        """Async context manager which holds a lock on `key` for at most `ttl` seconds"""
+        ...
+
+    @abstractmethod
+    async def _take_token(self, key: str, rate: float, capacity: int) -> float:
+        """Take a token from a bucket if one is available, otherwise return how long to wait (in seconds) for one"""
+        ...
+
+    async def close(self) -> None:
+        return
+
+    async def acquire_token(self, key: str, rate: float, capacity: int) -> None:
+        """Wait until a token bucket, refilled at `rate` tokens per second up to `capacity`, has a token to take"""
+
+        while (wait := await self._take_token(key, rate, capacity)) > 0:
+            await asyncio.sleep(wait)
+
+    async def get_or_load(
+        self, key: str, ttl: float, loader: Callable[[], Awaitable[bytes]], refresh: bool = False
+    ) -> bytes:
+        """
+        Get a value, or load and store it if it's missing
+
+        Concurrent callers of the same missing key (in any process) wait for one of them to load it,
+        rather than all of them loading it
+
+        Args:
+            refresh (bool): skip reading the stored value, but still store the loaded one
+        """
+
+        if not refresh and (value := await self.get(key)) is not None:
+            return value
+
+        async with self.lock(f"lock:{key}"):
+            if not refresh and (value := await self.get(key)) is not None:
+                return value
+
+            value = await loader()
+            await self.set(key, value, ttl)
+            return value
+
+
+class InProcessBackend(SharedStateBackend):
+    """Backend for a single bot process; nothing is shared with other processes"""
+
+    def __init__(self, max_bytes: int = SHARED_BACKEND_MAX_BYTES) -> None:
+        self._cache: TLRUCache[str, tuple[float, bytes]] = TLRUCache(
+            maxsize=max_bytes,
+            ttu=lambda _, value, now: value[0],
+            timer=time.time,
+            getsizeof=lambda value: len(value[1]),
+        )
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    @property
+    def size(self) -> int:
+        """Total size of the cached values in bytes"""
+        return int(self._cache.currsize)
+
+    @property
+    def max_bytes(self) -> int:
+        return int(self._cache.maxsize)
+
+    async def get(self, key: str) -> bytes | None:
+        value = self._cache.get(key)
+        return value[1] if value else None
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self._cache[key] = (time.time() + ttl, value)
+        except ValueError:
+            # too large to cache
+            pass
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = DEFAULT_LOCK_TTL) -> AsyncIterator[None]:
+        # everything runs in one event loop, so the lock can't be abandoned and `ttl` isn't needed
+        lock, waiters = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, waiters + 1)
+        try:
+            async with lock:
+                yield
+
+        finally:
+            lock, waiters = self._locks[key]
+            if waiters > 1:
+                self._locks[key] = (lock, waiters - 1)
+            else:
+                del self._locks[key]
+
+    async def _take_token(self, key: str, rate: float, capacity: int) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / rate
+
+
+class RedisBackend(SharedStateBackend):
+    """
+    Backend shared between every bot process connected to the same Redis server
+
+    If Redis errors or can't be reached, this process falls back to its own in-process backend, so commands keep
+    working without sharing anything; Redis is tried again after `REDIS_RETRY_INTERVAL` seconds
+    """
+
+    _RELEASE_LOCK_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    _TAKE_TOKEN_SCRIPT = """
+    local rate = tonumber(ARGV[1])
+    local capacity = tonumber(ARGV[2])
+    local time = redis.call('TIME')
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated_at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, namespace: str = "statsbot", retry_interval: float = REDIS_RETRY_INTERVAL) -> None:
+        self.client = RedisClient(url)
+        self.namespace = namespace
+        self.retry_interval = retry_interval
+        self.fallback = InProcessBackend()
+
+        self._unavailable_until = 0.0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    @property
+    def is_available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    async def _execute(self, *args: Any) -> RESPValue:
+        """Run a Redis command, raising `SharedBackendException` if the caller should use the fallback instead"""
+
+        if not self.is_available:
+            raise SharedBackendUnavailableException("Redis is unavailable")
+
+        try:
+            return await self.client.execute(*args)
+
+        except SharedBackendUnavailableException as e:
+            logger.warning(f"{e}; using the in-process backend for the next {self.retry_interval:g} seconds")
+            self._unavailable_until = time.monotonic() + self.retry_interval
+            raise
+
+        except SharedBackendException as e:
+            logger.warning(f"Redis {args[0]} failed, using the in-process backend: {e}")
+            raise
+
+    async def get(self, key: str) -> bytes | None:
+        try:
+            return await self._execute("GET", self._key(key))  # type: ignore
+        except SharedBackendException:
+            return await self.fallback.get(key)
+
+    async def get_many(self, keys: list[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+
+        try:
+            return await self._execute("MGET", *[self._key(key) for key in keys])  # type: ignore
+        except SharedBackendException:
+            return await self.fallback.get_many(keys)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            await self._execute("SET", self._key(key), value, "PX", max(int(ttl * 1000), 1))
+        except SharedBackendException:
+            await self.fallback.set(key, value, ttl)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = DEFAULT_LOCK_TTL) -> AsyncIterator[None]:
+        redis_key = self._key(key)
+        token = uuid.uuid4().hex
+        delay = 0.01
+        try:
+            while not await self._execute("SET", redis_key, token, "NX", "PX", int(ttl * 1000)):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.25)
+
+        except SharedBackendException:
+            # this only locks out callers in this process, but that's better than failing the caller
+            async with self.fallback.lock(key, ttl):
+                yield
+
+            return
+
+        try:
+            yield
+        finally:
+            try:
+                # only release the lock if it's still ours, i.e. it hasn't expired and been taken by someone else
+                await self._execute("EVAL", self._RELEASE_LOCK_SCRIPT, 1, redis_key, token)
+            except SharedBackendException:
+                # it'll expire after `ttl`
+                pass
+
+    async def _take_token(self, key: str, rate: float, capacity: int) -> float:
+        try:
+            wait = await self._execute("EVAL", self._TAKE_TOKEN_SCRIPT, 1, self._key(key), rate, capacity)
+        except SharedBackendException:
+            return await self.fallback._take_token(key, rate, capacity)
+
+        return float(wait)  # type: ignore
+
+    async def close(self) -> None:
+        await self.client.close()
+
+
+def get_backend(url: str = SHARED_BACKEND_URL) -> SharedStateBackend:
+    if not url:
+        return InProcessBackend()
+
+    if url.startswith("redis://"):
+        logger.info("Using Redis shared backend")
+        return RedisBackend(url)
+
+    raise ValueError(f"Unsupported shared backend URL: {url}")
+
+
+shared_backend = get_backend()
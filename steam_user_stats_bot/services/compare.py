@@ -0,0 +1,58 @@
+import asyncio
+
+from ..models.steam import SteamLibraryComparison, SteamUserGameStats, SteamUserGameStatsAchievement
+from .steam import SteamUserService
+
+
+def unlock_keys(stats: list[SteamUserGameStats]) -> dict[tuple[str, str], SteamUserGameStatsAchievement]:
+    """Index a user's unlocked achievements by (app id, api name)"""
+
+    return {
+        (game_stats.app_id, achievement.api_name): achievement
+        for game_stats in stats
+        for achievement in game_stats.achievements
+        if achievement.achieved
+    }
+
+
+async def compare_libraries(
+    first: SteamUserService, first_user_id: str, second: SteamUserService, second_user_id: str
+) -> SteamLibraryComparison:
+    """
+    Compare two users' libraries, using each user's own API key for their data
+
+    Only shared games are fetched, since unshared games can't be compared. Both users' fetches run together,
+    so each shared game's global percentages and schema (which are public) are loaded once and shared through the
+    cache, rather than once per user
+    """
+
+    first_games, second_games = await asyncio.gather(
+        first.get_owned_games(first_user_id, include_game_info=True),
+        second.get_owned_games(second_user_id, include_game_info=True),
+    )
+
+    shared_app_ids = {game.app_id for game in first_games} & {game.app_id for game in second_games}
+    shared_games = sorted(
+        [game for game in first_games if game.app_id in shared_app_ids],
+        key=lambda game: game.playtime.all_time,
+        reverse=True,
+    )
+
+    app_ids = [game.app_id for game in shared_games]
+    first_stats, second_stats = await asyncio.gather(
+        first.get_user_achievements(first_user_id, app_ids, include_global_percentages=True),
+        second.get_user_achievements(second_user_id, app_ids, include_global_percentages=True),
+    )
+
+    first_unlocks, second_unlocks = unlock_keys(first_stats), unlock_keys(second_stats)
+    return SteamLibraryComparison(
+        shared_games=shared_games,
+        only_first=sorted(
+            [first_unlocks[key] for key in first_unlocks.keys() - second_unlocks.keys()],
+            key=lambda x: x.global_percent or 0,
+        ),
+        only_second=sorted(
+            [second_unlocks[key] for key in second_unlocks.keys() - first_unlocks.keys()],
+            key=lambda x: x.global_percent or 0,
+        ),
+    )
@@ -1,7 +1,23 @@
-from ..db.schema import UserInDB
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from ..db.schema import (
+    AchievementSchemaInDB,
+    GuildMemberInDB,
+    NotificationSubscriptionInDB,
+    UserAchievementInDB,
+    UserInDB,
+)
 from ..db.setup import session_context
-from ..models.db import User, UserIn
+from ..models.db import NotificationSubscription, User, UserAchievementUnlock, UserIn
 from ..models.exceptions import NotFoundException
+from ..models.steam import (
+    SteamGameSchema,
+    SteamGameSchemaAchievement,
+    SteamUserGameStats,
+)
 
 
 class UserDBService:
@@ -33,6 +49,22 @@ class UserDBService:
 
         return User.from_orm(existing_user) if existing_user else None
 
+    def get_users(self, user_ids: list[str]) -> dict[str, User]:
+        """Returns the users which exist, keyed by id"""
+
+        with session_context() as ses:
+            users = ses.query(UserInDB).filter(UserInDB.id.in_(user_ids)).all()
+
+        return {user.id: User.from_orm(user) for user in users}
+
+    def get_users_by_steam_id(self, steam_ids: list[str]) -> list[User]:
+        """Returns the users set up with any of the Steam accounts"""
+
+        with session_context() as ses:
+            users = ses.query(UserInDB).filter(UserInDB.steam_id_64.in_(steam_ids)).all()
+
+        return [User.from_orm(user) for user in users]
+
     def update_user(self, user: UserIn) -> User:
         with session_context() as ses:
             existing_user = ses.query(UserInDB).filter_by(id=user.id).first()
@@ -54,3 +86,210 @@ class UserDBService:
 
             ses.delete(existing_user)
             ses.commit()
+
+
+class AchievementSchemaDBService:
+    """Persists localized achievement schemas, so display text only needs to be fetched once per game"""
+
+    def get_schema(self, app_id: str, language: str) -> SteamGameSchema | None:
+        with session_context() as ses:
+            rows = ses.query(AchievementSchemaInDB).filter_by(app_id=app_id, language=language).all()
+
+        if not rows:
+            return None
+
+        return SteamGameSchema(
+            app_id=app_id,
+            language=language,
+            achievements=[
+                SteamGameSchemaAchievement(
+                    name=row.api_name, displayName=row.display_name, description=row.description, hidden=row.hidden
+                )
+                for row in rows
+            ],
+            fetched_at=min(row.updated_at for row in rows),
+        )
+
+    def save_schema(self, schema: SteamGameSchema) -> None:
+        """Replaces any existing schema for the same game and language"""
+
+        with session_context() as ses:
+            ses.query(AchievementSchemaInDB).filter_by(app_id=schema.app_id, language=schema.language).delete()
+            ses.add_all(
+                [
+                    AchievementSchemaInDB(
+                        app_id=schema.app_id,
+                        language=schema.language,
+                        api_name=achievement.api_name,
+                        display_name=achievement.display_name,
+                        description=achievement.description,
+                        hidden=achievement.hidden,
+                    )
+                    for achievement in schema.achievements
+                ]
+            )
+            ses.commit()
+
+
+class NotificationDBService:
+    """Manages which users have opted in to unlock notifications, and where to post them"""
+
+    def get_all_subscriptions(self) -> list[NotificationSubscription]:
+        with session_context() as ses:
+            subscriptions = ses.query(NotificationSubscriptionInDB).all()
+
+        return [NotificationSubscription.from_orm(subscription) for subscription in subscriptions]
+
+    def subscribe(self, user_id: str, guild_id: str, channel_id: str) -> NotificationSubscription:
+        """Creates or moves a user's subscription"""
+
+        with session_context() as ses:
+            subscription = ses.query(NotificationSubscriptionInDB).filter_by(user_id=user_id).first()
+            if subscription:
+                subscription.guild_id = guild_id
+                subscription.channel_id = channel_id
+            else:
+                subscription = NotificationSubscriptionInDB(user_id=user_id, guild_id=guild_id, channel_id=channel_id)
+
+            ses.add(subscription)
+            ses.commit()
+            ses.refresh(subscription)
+
+        return NotificationSubscription.from_orm(subscription)
+
+    def unsubscribe(self, user_id: str) -> None:
+        with session_context() as ses:
+            ses.query(NotificationSubscriptionInDB).filter_by(user_id=user_id).delete()
+            ses.commit()
+
+
+class GuildMemberDBService:
+    """Tracks which users have run commands in each guild, and their display names there"""
+
+    def save_member(self, guild_id: str, user_id: str, display_name: str) -> None:
+        with session_context() as ses:
+            member = ses.query(GuildMemberInDB).filter_by(guild_id=guild_id, user_id=user_id).first()
+            if member:
+                if member.display_name == display_name:
+                    return
+
+                member.display_name = display_name
+            else:
+                member = GuildMemberInDB(guild_id=guild_id, user_id=user_id, display_name=display_name)
+
+            ses.add(member)
+            ses.commit()
+
+    def get_display_names(self, guild_id: str, user_ids: list[str]) -> dict[str, str]:
+        """Returns the display names of the users who are known members of the guild, keyed by user id"""
+
+        with session_context() as ses:
+            rows = (
+                ses.query(GuildMemberInDB.user_id, GuildMemberInDB.display_name)
+                .filter(GuildMemberInDB.guild_id == guild_id, GuildMemberInDB.user_id.in_(user_ids))
+                .all()
+            )
+
+        return {user_id: display_name for user_id, display_name in rows}
+
+    def delete_guild(self, guild_id: str) -> None:
+        with session_context() as ses:
+            ses.query(GuildMemberInDB).filter_by(guild_id=guild_id).delete()
+            ses.commit()
+
+
+class UserAchievementDBService:
+    """Stores the achievements each user has unlocked, as they're fetched"""
+
+    def get_unlocked_api_names(
+        self, user_id: str, app_ids: list[str], notified_only: bool = False
+    ) -> dict[str, set[str]]:
+        """
+        Returns the api names of each game's unlocked achievements, keyed by app id
+
+        Args:
+            notified_only (bool): only include unlocks the unlock notifier has seen
+        """
+
+        with session_context() as ses:
+            query = ses.query(UserAchievementInDB.app_id, UserAchievementInDB.api_name).filter(
+                UserAchievementInDB.user_id == user_id, UserAchievementInDB.app_id.in_(app_ids)
+            )
+            if notified_only:
+                query = query.filter(UserAchievementInDB.notified.is_(True))
+
+            rows = query.all()
+
+        unlocked: dict[str, set[str]] = {app_id: set() for app_id in app_ids}
+        for app_id, api_name in rows:
+            unlocked[app_id].add(api_name)
+
+        return unlocked
+
+    def save_unlocks(self, user_id: str, stats: list[SteamUserGameStats], notified: bool = False) -> None:
+        """
+        Adds any unlocked achievements that aren't stored yet, and fills in unlock times which weren't known before
+
+        Args:
+            notified (bool): mark the unlocks as seen by the unlock notifier
+        """
+
+        try:
+            self._save_unlocks(user_id, stats, notified)
+        except IntegrityError:
+            # another writer stored some of the same unlocks after we checked; they're updated instead on retry
+            self._save_unlocks(user_id, stats, notified)
+
+    def _save_unlocks(self, user_id: str, stats: list[SteamUserGameStats], notified: bool) -> None:
+        app_ids = [game_stats.app_id for game_stats in stats]
+        with session_context() as ses:
+            existing = {
+                (row.app_id, row.api_name): row
+                for row in ses.query(UserAchievementInDB).filter(
+                    UserAchievementInDB.user_id == user_id, UserAchievementInDB.app_id.in_(app_ids)
+                )
+            }
+
+            for game_stats in stats:
+                for achievement in game_stats.achievements:
+                    if not achievement.achieved:
+                        continue
+
+                    if row := existing.get((game_stats.app_id, achievement.api_name)):
+                        # batched fetches don't include unlock times
+                        if row.achieved_at is None and achievement.achieved_at:
+                            row.achieved_at = achievement.achieved_at
+                        if notified:
+                            row.notified = True
+
+                        continue
+
+                    row = UserAchievementInDB(
+                        user_id=user_id,
+                        app_id=game_stats.app_id,
+                        api_name=achievement.api_name,
+                        game_name=game_stats.name,
+                        display_name=achievement.display_name,
+                        achieved_at=achievement.achieved_at,
+                        global_percent=achievement.global_percent,
+                        notified=notified,
+                    )
+                    existing[(game_stats.app_id, achievement.api_name)] = row
+                    ses.add(row)
+
+            ses.commit()
+
+    def get_recent_unlocks(self, guild_id: str, since: datetime, limit: int) -> list[UserAchievementUnlock]:
+        """Returns the unlocks of the guild's known members since `since`, newest first"""
+
+        members = select(GuildMemberInDB.user_id).where(GuildMemberInDB.guild_id == guild_id)
+        with session_context() as ses:
+            rows = (
+                ses.query(UserAchievementInDB)
+                .filter(UserAchievementInDB.achieved_at >= since, UserAchievementInDB.user_id.in_(members))
+                .order_by(UserAchievementInDB.achieved_at.desc())
+                .limit(limit)
+                .all()
+            )
+
+        return [UserAchievementUnlock.from_orm(row) for row in rows]
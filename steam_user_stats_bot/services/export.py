@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+from enum import Enum
+from typing import IO, Any, AsyncIterable, Generator
+
+from ..models.steam import SteamUserGame, SteamUserGameStats
+
+EXPORT_FIELDS = [
+    "app_id",
+    "game_name",
+    "api_name",
+    "display_name",
+    "achieved",
+    "achieved_at",
+    "global_percent",
+    "playtime_minutes",
+]
+
+
+class ExportFormat(Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+
+def achievement_rows(stats: SteamUserGameStats, game: SteamUserGame | None) -> Generator[dict[str, Any], None, None]:
+    """Flatten one game's achievement stats into export rows"""
+
+    playtime = game.playtime.all_time if game else None
+    for achievement in stats.achievements:
+        yield {
+            "app_id": stats.app_id,
+            "game_name": stats.name,
+            "api_name": achievement.api_name,
+            "display_name": achievement.display_name,
+            "achieved": achievement.achieved,
+            "achieved_at": achievement.achieved_at.isoformat() if achievement.achieved_at else None,
+            "global_percent": achievement.global_percent,
+            "playtime_minutes": playtime,
+        }
+
+
+async def write_achievement_export(
+    stats: AsyncIterable[SteamUserGameStats], games: list[SteamUserGame], fmt: ExportFormat, fileobj: IO[bytes]
+) -> int:
+    """
+    Write achievement rows to a gzip-compressed file as each game's stats arrive, so the full export is never held
+    in memory
+
+    Args:
+        stats (AsyncIterable[SteamUserGameStats]): the stats to export, e.g. from `SteamUserService.iter_user_achievements`
+        games (list[SteamUserGame]): the user's owned games, used to look up playtime
+        fmt (ExportFormat): the export file format
+        fileobj (IO[bytes]): the binary file to write the compressed export to
+
+    Returns:
+        rows (int): the number of rows written
+    """
+
+    games_by_id = {game.app_id: game for game in games}
+    rows_written = 0
+
+    # closing the gzip file writes its trailer, but leaves `fileobj` open for the caller
+    with io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj, mode="wb"), encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+        if fmt is ExportFormat.csv:
+            writer.writeheader()
+
+        async for game_stats in stats:
+            for row in achievement_rows(game_stats, games_by_id.get(game_stats.app_id)):
+                if fmt is ExportFormat.csv:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row) + "\n")
+
+                rows_written += 1
+
+    return rows_written
@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import time
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Awaitable, Callable
+
+from ..config import (
+    NOTIFICATIONS_MAX_CONCURRENCY,
+    NOTIFICATIONS_MAX_POLL_INTERVAL,
+    NOTIFICATIONS_MIN_POLL_INTERVAL,
+)
+from ..models.db import NotificationSubscription, User
+from ..models.steam import SteamUserGameStats, SteamUserGameStatsAchievement
+from .db import NotificationDBService, UserAchievementDBService, UserDBService
+from .scheduler import RequestPriority
+from .steam import AchievementFetchMode, SteamUserService
+
+logger = getLogger("notifications")
+
+SUBSCRIPTION_RELOAD_INTERVAL = 60.0
+"""How often (in seconds) to reload subscriptions, so new and removed subscriptions are picked up"""
+
+UnlockCallback = Callable[[NotificationSubscription, list[SteamUserGameStatsAchievement]], Awaitable[None]]
+
+
+@dataclass
+class PollState:
+    interval: float = NOTIFICATIONS_MIN_POLL_INTERVAL
+    next_poll_at: float = 0
+    playtimes: dict[str, int] = field(default_factory=dict)
+    """All-time playtime of each recently played game as of the last poll"""
+
+
+class AchievementDiffEngine:
+    """Finds newly unlocked achievements by diffing fresh stats against each user's stored snapshot"""
+
+    def __init__(self) -> None:
+        self.snapshots = UserAchievementDBService()
+
+    async def get_candidate_games(
+        self, steam: SteamUserService, user_id: str, state: PollState
+    ) -> tuple[list[str], dict[str, int]]:
+        """
+        Finds games the user has played since the last poll, which are the only ones that could have new unlocks
+
+        Returns:
+            candidates (list[str]): the app ids of the candidate games
+            playtimes (dict[str, int]): the current playtimes, to store in the poll state once the games are checked
+        """
+
+        recent_games = await steam.get_recently_played_games(user_id)
+        playtimes = {game.app_id: game.playtime.all_time for game in recent_games}
+        candidates = [app_id for app_id, playtime in playtimes.items() if state.playtimes.get(app_id) != playtime]
+        return candidates, playtimes
+
+    async def diff(
+        self, user_id: str, stats: list[SteamUserGameStats], since: float | None = None
+    ) -> list[SteamUserGameStatsAchievement]:
+        """
+        Returns unlocked achievements the notifier hasn't seen yet, then marks them as seen
+
+        Args:
+            since (float | None): ignore unlocks before this unix timestamp, e.g. from before the user subscribed
+        """
+
+        # the database is SQLite, so it's used from a thread rather than blocking the event loop for every user
+        unlocked = await asyncio.to_thread(
+            self.snapshots.get_unlocked_api_names,
+            user_id,
+            [game_stats.app_id for game_stats in stats],
+            notified_only=True,
+        )
+        new_unlocks: list[SteamUserGameStatsAchievement] = []
+        for game_stats in stats:
+            for achievement in game_stats.achievements:
+                if not achievement.achieved or achievement.api_name in unlocked[game_stats.app_id]:
+                    continue
+                if since and not (achievement.achieved_at and achievement.achieved_at.timestamp() >= since):
+                    continue
+
+                new_unlocks.append(achievement)
+
+        await asyncio.to_thread(self.snapshots.save_unlocks, user_id, stats, notified=True)
+        return new_unlocks
+
+
+class UnlockNotifier:
+    """
+    Polls subscribed users for new achievement unlocks
+
+    Users who aren't playing anything are polled less and less often, up to the max poll interval,
+    and go back to the min poll interval as soon as they play something
+    """
+
+    def __init__(
+        self,
+        on_unlock: UnlockCallback,
+        min_interval: float = NOTIFICATIONS_MIN_POLL_INTERVAL,
+        max_interval: float = NOTIFICATIONS_MAX_POLL_INTERVAL,
+        max_concurrency: int = NOTIFICATIONS_MAX_CONCURRENCY,
+    ) -> None:
+        self.on_unlock = on_unlock
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_concurrency = max_concurrency
+
+        self.engine = AchievementDiffEngine()
+        self.subscriptions_db = NotificationDBService()
+        self.users_db = UserDBService()
+        self.states: dict[str, PollState] = {}
+        self.subscriptions: dict[str, NotificationSubscription] = {}
+
+        self._subscriptions_loaded_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.poll_due_users()
+            except Exception as e:
+                logger.error(f"Unlock notification poll failed: {type(e).__name__}: {e}")
+
+            await asyncio.sleep(min(self.min_interval, 10))
+
+    async def load_subscriptions(self) -> dict[str, NotificationSubscription]:
+        """The current subscriptions by user id, reloaded from the database every `SUBSCRIPTION_RELOAD_INTERVAL`"""
+
+        now = time.monotonic()
+        if self._subscriptions_loaded_at is None or now - self._subscriptions_loaded_at >= SUBSCRIPTION_RELOAD_INTERVAL:
+            subscriptions = await asyncio.to_thread(self.subscriptions_db.get_all_subscriptions)
+            self.subscriptions = {subscription.user_id: subscription for subscription in subscriptions}
+            self._subscriptions_loaded_at = now
+
+            for user_id in set(self.states) - set(self.subscriptions):
+                del self.states[user_id]
+
+        return self.subscriptions
+
+    async def poll_due_users(self) -> None:
+        subscriptions = await self.load_subscriptions()
+        now = time.time()
+
+        due = [
+            (state.next_poll_at, user_id)
+            for user_id in subscriptions
+            if (state := self.states.setdefault(user_id, PollState(interval=self.min_interval))).next_poll_at <= now
+        ]
+        if not due:
+            return
+
+        heapq.heapify(due)
+        users = await asyncio.to_thread(self.users_db.get_users, [user_id for _, user_id in due])
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def poll(subscription: NotificationSubscription) -> None:
+            async with semaphore:
+                try:
+                    await self.poll_user(subscription, users.get(subscription.user_id))
+                except Exception as e:
+                    logger.warning(f"Failed to poll user {subscription.user_id}: {type(e).__name__}: {e}")
+
+        # most overdue first
+        await asyncio.gather(*[poll(subscriptions[heapq.heappop(due)[1]]) for _ in range(len(due))])
+
+    async def poll_user(self, subscription: NotificationSubscription, user: User | None) -> None:
+        state = self.states[subscription.user_id]
+        if not (user and user.steam_api_key and user.steam_id_64):
+            state.next_poll_at = time.time() + self.max_interval
+            return
+
+        # unlock times are needed to ignore unlocks from before the user subscribed
+        steam = SteamUserService(
+            user.steam_api_key,
+            use_cache=False,
+            fetch_mode=AchievementFetchMode.per_app,
+            priority=RequestPriority.background,
+        )
+        candidates, playtimes = await self.engine.get_candidate_games(steam, user.steam_id_64, state)
+        if not candidates:
+            state.interval = min(state.interval * 2, self.max_interval)
+            state.next_poll_at = time.time() + state.interval
+            return
+
+        state.interval = self.min_interval
+        state.next_poll_at = time.time() + state.interval
+
+        stats = await steam.get_user_achievements(user.steam_id_64, candidates, include_global_percentages=True)
+        since = subscription.created_at.timestamp() if subscription.created_at else None
+        new_unlocks = await self.engine.diff(subscription.user_id, stats, since=since)
+        state.playtimes = playtimes
+
+        if new_unlocks:
+            await self.on_unlock(subscription, new_unlocks)
@@ -0,0 +1,88 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from logging import getLogger
+from typing import Any, Callable, TypeVar
+
+from ..config import CPU_OFFLOAD_EXECUTOR, CPU_OFFLOAD_MAX_WORKERS, CPU_OFFLOAD_THRESHOLD
+
+R = TypeVar("R")
+T = TypeVar("T")
+
+logger = getLogger("offload")
+
+
+class OffloadMode(Enum):
+    none = "none"
+    thread = "thread"
+    process = "process"
+
+
+try:
+    mode = OffloadMode(CPU_OFFLOAD_EXECUTOR)
+except ValueError:
+    logger.warning(f"Unknown CPU offload executor '{CPU_OFFLOAD_EXECUTOR}'; running CPU-heavy work on the event loop")
+    mode = OffloadMode.none
+
+_executor: Executor | None = None
+
+
+def get_executor() -> Executor | None:
+    """Get the executor for CPU-heavy work, creating it on first use"""
+
+    global _executor
+    if _executor or mode is OffloadMode.none:
+        return _executor
+
+    if mode is OffloadMode.process:
+        _executor = ProcessPoolExecutor(max_workers=CPU_OFFLOAD_MAX_WORKERS)
+    else:
+        _executor = ThreadPoolExecutor(max_workers=CPU_OFFLOAD_MAX_WORKERS, thread_name_prefix="offload")
+
+    return _executor
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any, size: int, threshold: int = CPU_OFFLOAD_THRESHOLD) -> T:
+    """
+    Run a CPU-heavy function in the offload executor, so the event loop stays responsive
+
+    Small payloads aren't worth the handoff, so they run inline. With a process executor, `func`
+    must be a module-level function, and its arguments and result must be picklable
+
+    Args:
+        size (int): the size of the payload, e.g. the number of achievements, which is compared to `threshold`
+    """
+
+    if size < threshold or (executor := get_executor()) is None:
+        return func(*args)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+
+
+def _run_then(func: Callable[..., R], then: Callable[[R], T], *args: Any) -> T:
+    return then(func(*args))
+
+
+async def run_cpu_bound_then(
+    func: Callable[..., R], then: Callable[[R], T], *args: Any, size: int, threshold: int = CPU_OFFLOAD_THRESHOLD
+) -> T:
+    """
+    Like `run_cpu_bound`, for a `func` which returns compact primitives that `then` turns into models
+
+    Process workers pickle their arguments and results, which can cost more than the work they save if they're
+    model graphs, so `then` runs on the event loop after a process returns. Threads don't pickle anything, so
+    there `then` runs in the thread along with `func`
+    """
+
+    if mode is OffloadMode.process:
+        return then(await run_cpu_bound(func, *args, size=size, threshold=threshold))
+
+    return await run_cpu_bound(_run_then, func, then, *args, size=size, threshold=threshold)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
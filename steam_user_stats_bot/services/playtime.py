@@ -0,0 +1,85 @@
+import heapq
+from array import array
+
+from cachetools import TTLCache
+
+from ..clients.cache import ENDPOINT_TTLS
+from ..config import STEAM_PLAYTIME_TABLE_CACHE_MAX_BYTES
+from ..models.steam import SteamUserGame
+from .steam import SteamUserService
+
+_TABLE_OVERHEAD = 400
+"""Approximate size in bytes of a playtime table and its five columns, not counting their contents"""
+_NAME_OVERHEAD = 60
+"""Approximate size in bytes of a game name string and its list slot, not counting its text"""
+
+
+class PlaytimeTable:
+    """
+    A user's playtime for every owned game, stored column-wise in flat arrays of minutes
+
+    Rows line up across columns, so aggregates are single passes over packed integers, rather than over thousands of
+    game models
+    """
+
+    def __init__(self, games: list[SteamUserGame]) -> None:
+        self.names = [game.name or game.app_id for game in games]
+        self.all_time = array("q", (game.playtime.all_time for game in games))
+        self.windows = array("q", (game.playtime.all_time_windows for game in games))
+        self.mac = array("q", (game.playtime.all_time_mac for game in games))
+        self.linux = array("q", (game.playtime.all_time_linux for game in games))
+
+    def __len__(self) -> int:
+        return len(self.all_time)
+
+    @property
+    def total(self) -> int:
+        return sum(self.all_time)
+
+    @property
+    def platform_totals(self) -> dict[str, int]:
+        return {"Windows": sum(self.windows), "Mac": sum(self.mac), "Linux": sum(self.linux)}
+
+    @property
+    def never_played(self) -> int:
+        return self.all_time.count(0)
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        """The `n` most played games and their playtime, most played first"""
+
+        rows = heapq.nlargest(n, range(len(self)), key=self.all_time.__getitem__)
+        return [(self.names[row], self.all_time[row]) for row in rows if self.all_time[row]]
+
+
+def approximate_playtime_table_size(table: PlaytimeTable) -> int:
+    """Approximate in-memory size of a playtime table in bytes, for sizing the playtime table cache"""
+
+    columns = (table.all_time, table.windows, table.mac, table.linux)
+    return (
+        _TABLE_OVERHEAD
+        + sum(column.itemsize * len(column) for column in columns)
+        + sum(_NAME_OVERHEAD + len(name) for name in table.names)
+    )
+
+
+playtime_tables: TTLCache[str, PlaytimeTable] = TTLCache(
+    maxsize=STEAM_PLAYTIME_TABLE_CACHE_MAX_BYTES,
+    ttl=ENDPOINT_TTLS["/IPlayerService/GetOwnedGames/v0001"],
+    getsizeof=approximate_playtime_table_size,
+)
+"""Playtime tables by user id; they expire with the owned games response they're built from"""
+
+
+async def get_playtime_table(steam: SteamUserService, user_id: str) -> PlaytimeTable:
+    if (table := playtime_tables.get(user_id)) is not None:
+        return table
+
+    games = await steam.get_owned_games(user_id, include_game_info=True)
+    table = PlaytimeTable(games)
+    try:
+        playtime_tables[user_id] = table
+    except ValueError:
+        # too large for the cache; it's rebuilt next time instead
+        pass
+
+    return table
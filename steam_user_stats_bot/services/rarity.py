@@ -0,0 +1,304 @@
+import asyncio
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from logging import getLogger
+
+from ..config import (
+    RARITY_SNAPSHOT_ENABLED,
+    RARITY_SNAPSHOT_MAX_AGE,
+    RARITY_SNAPSHOT_PATH,
+    RARITY_SNAPSHOT_REBUILD_INTERVAL,
+)
+from .backends import shared_backend
+
+logger = getLogger("rarity_snapshot")
+
+_MAGIC = b"SRAR"
+_VERSION = 1
+_HEADER = struct.Struct("=4sIIIII")
+"""magic, version, name count, app count, entry count, name blob size"""
+
+_RELOAD_CHECK_INTERVAL = 5.0
+"""How often (in seconds) to check whether another process has rebuilt the snapshot"""
+
+
+class RaritySnapshot:
+    """
+    A read-only, memory-mapped snapshot of games' global achievement percentages
+
+    The file holds an interned, sorted table of achievement names, followed by sorted app ids, each app's
+    `(name id, percent)` pairs sorted by name id, and when each app was fetched. Every process maps the same file,
+    so the OS shares its pages, and lookups read straight from the mapping instead of building models
+
+    Arrays are stored in native byte order, so snapshots aren't portable between machines
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mmap)
+        magic, version, n_names, n_apps, n_entries, blob_size = _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION:
+            view.release()
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {_VERSION} rarity snapshot")
+
+        offset = _HEADER.size
+
+        def section(length: int) -> memoryview:
+            nonlocal offset
+            start, offset = offset, offset + length * 4
+            return view[start:offset]
+
+        self._name_offsets = section(n_names + 1).cast("I")
+        self._app_ids = section(n_apps).cast("I")
+        self._app_fetched_at = section(n_apps).cast("I")
+        self._app_starts = section(n_apps + 1).cast("I")
+        self._entry_names = section(n_entries).cast("I")
+        self._entry_percents = section(n_entries).cast("f")
+        self._names = view[offset : offset + blob_size]
+        self._view = view
+
+    def __len__(self) -> int:
+        return len(self._app_ids)
+
+    def __contains__(self, app_id: str) -> bool:
+        return self._find_app(app_id) is not None
+
+    def close(self) -> None:
+        for view in (
+            self._name_offsets,
+            self._app_ids,
+            self._app_fetched_at,
+            self._app_starts,
+            self._entry_names,
+            self._entry_percents,
+            self._names,
+            self._view,
+        ):
+            view.release()
+
+        self._mmap.close()
+
+    def _name(self, name_id: int) -> bytes:
+        return bytes(self._names[self._name_offsets[name_id] : self._name_offsets[name_id + 1]])
+
+    def _find_app(self, app_id: str) -> int | None:
+        try:
+            key = int(app_id)
+        except ValueError:
+            return None
+
+        row = bisect_left(self._app_ids, key)
+        return row if row < len(self._app_ids) and self._app_ids[row] == key else None
+
+    def _percents(self, row: int) -> dict[str, float]:
+        start, end = self._app_starts[row], self._app_starts[row + 1]
+        return {self._name(self._entry_names[i]).decode(): self._entry_percents[i] for i in range(start, end)}
+
+    def fetched_at(self, app_id: str) -> int | None:
+        """When an app's percentages were fetched, as a unix timestamp"""
+
+        row = self._find_app(app_id)
+        return None if row is None else self._app_fetched_at[row]
+
+    def get_percents(self, app_id: str) -> dict[str, float] | None:
+        """All of an app's global percentages by achievement name, or None if the app isn't in the snapshot"""
+
+        row = self._find_app(app_id)
+        return None if row is None else self._percents(row)
+
+    def rarest_percent(self, app_id: str) -> float | None:
+        """The percent of an app's rarest achievement, or None if it has no achievements or isn't in the snapshot"""
+
+        if (row := self._find_app(app_id)) is None:
+            return None
+
+        return min(self._entry_percents[self._app_starts[row] : self._app_starts[row + 1]], default=None)
+
+    def items(self):
+        """Iterate over every app's id, fetch time, and percentages"""
+
+        for row, app_id in enumerate(self._app_ids):
+            yield str(app_id), self._app_fetched_at[row], self._percents(row)
+
+
+def write_rarity_snapshot(path: str, apps: dict[str, tuple[int, dict[str, float]]]) -> None:
+    """
+    Atomically write a snapshot of apps' fetch times and global percentages
+
+    Readers which already have the old snapshot mapped keep reading it until they reopen the file
+    """
+
+    names = sorted({name.encode() for _, percents in apps.values() for name in percents})
+    name_ids = {name: i for i, name in enumerate(names)}
+
+    name_offsets = array("I", [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+
+    app_ids, app_fetched_at, app_starts = array("I"), array("I"), array("I", [0])
+    entry_names, entry_percents = array("I"), array("f")
+    for app_id in sorted(apps, key=int):
+        fetched_at, percents = apps[app_id]
+        entries = sorted((name_ids[name.encode()], percent) for name, percent in percents.items())
+
+        app_ids.append(int(app_id))
+        app_fetched_at.append(fetched_at)
+        entry_names.extend(name_id for name_id, _ in entries)
+        entry_percents.extend(percent for _, percent in entries)
+        app_starts.append(len(entry_names))
+
+    blob = b"".join(names)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(names), len(app_ids), len(entry_names), len(blob)))
+        for section in (name_offsets, app_ids, app_fetched_at, app_starts, entry_names, entry_percents):
+            section.tofile(f)
+
+        f.write(blob)
+
+    os.replace(tmp_path, path)
+
+
+class RaritySnapshotStore:
+    """
+    Serves global percentages from the shared snapshot, and periodically rebuilds it with newly fetched games
+
+    Games which were fetched more than `max_age` seconds ago are ignored, and dropped on the next rebuild
+    """
+
+    def __init__(
+        self,
+        path: str = RARITY_SNAPSHOT_PATH,
+        rebuild_interval: float = RARITY_SNAPSHOT_REBUILD_INTERVAL,
+        max_age: float = RARITY_SNAPSHOT_MAX_AGE,
+    ) -> None:
+        self.path = path
+        self.rebuild_interval = rebuild_interval
+        self.max_age = max_age
+
+        self._snapshot: RaritySnapshot | None = None
+        self._stat: tuple[int, int] | None = None
+        self._checked_at = 0.0
+        self._pending: dict[str, tuple[int, dict[str, float]]] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def snapshot(self) -> RaritySnapshot | None:
+        """The latest snapshot, reopened if another process has rebuilt it"""
+
+        now = time.monotonic()
+        if now - self._checked_at < _RELOAD_CHECK_INTERVAL:
+            return self._snapshot
+
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self._snapshot
+
+        if (stat.st_ino, stat.st_mtime_ns) != self._stat:
+            self._reopen((stat.st_ino, stat.st_mtime_ns))
+
+        return self._snapshot
+
+    def _reopen(self, stat: tuple[int, int]) -> None:
+        try:
+            snapshot = RaritySnapshot(self.path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to open rarity snapshot: {e}")
+            return
+
+        if self._snapshot:
+            self._snapshot.close()
+
+        self._snapshot, self._stat = snapshot, stat
+
+    def _is_fresh(self, snapshot: RaritySnapshot, app_id: str) -> bool:
+        fetched_at = snapshot.fetched_at(app_id)
+        return fetched_at is not None and time.time() - fetched_at < self.max_age
+
+    def get_percents(self, app_id: str) -> dict[str, float] | None:
+        if not ((snapshot := self.snapshot) and self._is_fresh(snapshot, app_id)):
+            return None
+
+        return snapshot.get_percents(app_id)
+
+    def get_rarest_percent(self, app_id: str) -> tuple[bool, float | None]:
+        """Whether the app is in the snapshot, and if so, the percent of its rarest achievement"""
+
+        if not ((snapshot := self.snapshot) and self._is_fresh(snapshot, app_id)):
+            return False, None
+
+        return True, snapshot.rarest_percent(app_id)
+
+    def add(self, app_id: str, percents: dict[str, float]) -> None:
+        """Queue freshly fetched percentages for the next rebuild"""
+
+        self._pending[app_id] = (int(time.time()), percents)
+
+    def _rebuild(self, pending: dict[str, tuple[int, dict[str, float]]]) -> int:
+        apps: dict[str, tuple[int, dict[str, float]]] = {}
+        try:
+            # map our own copy, since the event loop may swap out the shared one while we're reading
+            snapshot = RaritySnapshot(self.path)
+        except (OSError, ValueError):
+            pass
+        else:
+            try:
+                oldest = time.time() - self.max_age
+                apps = {app_id: (fetched_at, percents) for app_id, fetched_at, percents in snapshot.items()}
+                apps = {app_id: app for app_id, app in apps.items() if app[0] >= oldest}
+            finally:
+                snapshot.close()
+
+        apps.update(pending)
+        write_rarity_snapshot(self.path, apps)
+        return len(apps)
+
+    async def rebuild(self) -> None:
+        """Merge newly fetched games into the snapshot, holding a lock so processes don't overwrite each other"""
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        try:
+            async with shared_backend.lock("rarity_snapshot", ttl=60):
+                count = await asyncio.to_thread(self._rebuild, pending)
+
+        except Exception:
+            # try again next time
+            self._pending = pending | self._pending
+            raise
+
+        self._checked_at = 0
+        logger.info(f"Rebuilt rarity snapshot with {count:,} games ({len(pending):,} new)")
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild rarity snapshot")
+
+
+rarity_snapshots = RaritySnapshotStore() if RARITY_SNAPSHOT_ENABLED else None
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import random
+import time
+from logging import getLogger
+
+from ..config import (
+    BACKGROUND_REFRESH_INTERVAL,
+    BACKGROUND_REFRESH_JITTER,
+    BACKGROUND_REFRESH_REQUEST_BUDGET,
+    STEAM_CACHE_TTL,
+)
+from ..models.db import User
+from .db import UserDBService
+from .scheduler import RequestPriority
+from .steam import SteamUserService
+
+logger = getLogger("background_refresh")
+
+_MAX_AGE = 60 * 60 * 24
+"""Activity and staleness older than this (in seconds) are treated the same"""
+
+
+class BackgroundRefreshScheduler:
+    """
+    Refreshes set-up users' owned games and achievements in the background, so their commands are served from cache
+
+    Each cycle, users are refreshed in priority order (most recently active and most stale first) until the
+    cycle's request budget is used up
+    """
+
+    def __init__(
+        self,
+        interval: float = BACKGROUND_REFRESH_INTERVAL,
+        request_budget: int = BACKGROUND_REFRESH_REQUEST_BUDGET,
+        jitter: float = BACKGROUND_REFRESH_JITTER,
+    ) -> None:
+        self.interval = interval
+        self.request_budget = request_budget
+        self.jitter = jitter
+        self.db = UserDBService()
+
+        self.last_active: dict[str, float] = {}
+        self.last_refreshed: dict[str, float] = {}
+        self.estimated_requests: dict[str, int] = {}
+        """Requests used by each user's last refresh"""
+
+        self._urgent: set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def record_activity(self, user_id: str | int) -> None:
+        self.last_active[str(user_id)] = time.time()
+
+    def prioritize(self, user_id: str | int) -> None:
+        """Refresh a user as soon as possible, e.g. right after they've set up"""
+
+        self._urgent.add(str(user_id))
+        self._wakeup.set()
+
+    def priority(self, user_id: str, now: float) -> float:
+        """Lower values are refreshed first"""
+
+        if user_id in self._urgent:
+            return float("-inf")
+
+        activity_age = min(now - self.last_active.get(user_id, 0), _MAX_AGE)
+        staleness = min(now - self.last_refreshed.get(user_id, 0), _MAX_AGE)
+        return activity_age - staleness
+
+    def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                logger.error(f"Background refresh cycle failed: {type(e).__name__}: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval + random.uniform(0, self.jitter))
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+
+    async def run_cycle(self) -> None:
+        now = time.time()
+        users = {user.id: user for user in self.db.get_all_users() if user.is_setup}
+
+        # users refreshed within half a cache TTL are still warm
+        queue = [
+            (self.priority(user_id, now), user_id)
+            for user_id in users
+            if user_id in self._urgent or now - self.last_refreshed.get(user_id, 0) > STEAM_CACHE_TTL / 2
+        ]
+        heapq.heapify(queue)
+
+        budget = self.request_budget
+        refreshed = 0
+        while queue and budget > 0:
+            _, user_id = heapq.heappop(queue)
+            cost = self.estimated_requests.get(user_id, 1)
+            if cost > budget and user_id not in self._urgent and budget < self.request_budget:
+                # too expensive for what's left of this cycle; cheaper users may still fit
+                continue
+
+            self._urgent.discard(user_id)
+            budget -= await self.refresh_user(users[user_id])
+            refreshed += 1
+
+            # spread requests out rather than bursting through the whole budget
+            await asyncio.sleep(random.uniform(0, self.jitter))
+
+        if refreshed:
+            logger.info(f"Refreshed {refreshed} users using {self.request_budget - budget} requests")
+
+    async def refresh_user(self, user: User) -> int:
+        """Fetch a user's owned games and achievements, returning the (approximate) number of requests used"""
+
+        if not (user.steam_api_key and user.steam_id_64):
+            return 0
+
+        # skip reading the caches, so the responses we fetch replace the ones which are about to expire
+        steam = SteamUserService(user.steam_api_key, use_cache=False, priority=RequestPriority.background)
+        requests = 1
+        try:
+            games = await steam.get_owned_games(user.steam_id_64)
+            requests += len(games) * 2
+            await steam.get_user_achievements(
+                user.steam_id_64, [game.app_id for game in games], include_global_percentages=True
+            )
+
+        except Exception as e:
+            logger.warning(f"Failed to refresh user {user.id}: {type(e).__name__}: {e}")
+
+        self.last_refreshed[user.id] = time.time()
+        self.estimated_requests[user.id] = requests
+        return requests
+
+
+refresh_scheduler = BackgroundRefreshScheduler()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+from logging import getLogger
+
+from ..models.db import User
+from ..models.steam import SteamGameCompletion, SteamUserGameStats, SteamUserReport
+from .db import UserDBService
+from .scheduler import RequestPriority
+from .steam import AchievementFetchMode, SteamUserService, rank_rarest_achievements
+
+logger = getLogger("reports")
+
+
+async def build_user_report(
+    user_id: str, steam_id: str, stats: list[SteamUserGameStats], games_total: int, limit: int
+) -> SteamUserReport:
+    """Rank a user's rarest achievements and tally their completion of each game"""
+
+    # ranking is offloaded with only the global percents, rather than every game's stats
+    rarest = await rank_rarest_achievements(stats, limit)
+
+    completion = [
+        SteamGameCompletion(
+            app_id=game_stats.app_id,
+            name=game_stats.name,
+            unlocked=sum(achievement.achieved for achievement in game_stats.achievements),
+            total=len(game_stats.achievements),
+        )
+        for game_stats in stats
+        if game_stats.achievements
+    ]
+    completion.sort(key=lambda x: x.percent, reverse=True)
+
+    return SteamUserReport(
+        user_id=user_id,
+        steam_id=steam_id,
+        generated_at=datetime.now(),
+        games_scanned=len(stats),
+        games_total=games_total,
+        rarest=rarest,
+        completion=completion,
+    )
+
+
+class ReportGenerator:
+    """
+    Computes rarity and completion reports for set-up users, without a Discord connection
+
+    Every user is fetched concurrently on one event loop, in the background request lane, so reports share the
+    request scheduler, rate limits, and caches with everything else (e.g. to warm caches from a nightly cron job)
+    """
+
+    def __init__(self, output_dir: str, rarest_limit: int = 50, max_concurrency: int = 5) -> None:
+        self.output_dir = output_dir
+        self.rarest_limit = rarest_limit
+        self.max_concurrency = max_concurrency
+        self.db = UserDBService()
+
+    def get_users(self, user_ids: list[str] | None = None) -> list[User]:
+        if user_ids is None:
+            users = self.db.get_all_users()
+        else:
+            users = [user for user_id in user_ids if (user := self.db.get_user(user_id))]
+
+        return [user for user in users if user.is_setup]
+
+    async def generate_user_report(self, user: User) -> SteamUserReport:
+        if not (user.steam_api_key and user.steam_id_64):
+            raise ValueError(f"User {user.id} is not set up")
+
+        # completion needs locked achievements, which batched fetching doesn't return
+        steam = SteamUserService(
+            user.steam_api_key, fetch_mode=AchievementFetchMode.per_app, priority=RequestPriority.background
+        )
+        games = await steam.get_owned_games(user.steam_id_64)
+        stats = await steam.get_user_achievements(
+            user.steam_id_64, [game.app_id for game in games], include_global_percentages=True
+        )
+
+        return await build_user_report(user.id, user.steam_id_64, stats, len(games), self.rarest_limit)
+
+    def write_report(self, report: SteamUserReport) -> str:
+        """Write a report to `{output_dir}/{user_id}.json`, replacing the previous one atomically"""
+
+        path = os.path.join(self.output_dir, f"{report.user_id}.json")
+        with tempfile.NamedTemporaryFile("w", dir=self.output_dir, suffix=".tmp", delete=False) as f:
+            f.write(report.json(indent=2))
+
+        os.replace(f.name, path)
+        return path
+
+    async def generate(self, user_ids: list[str] | None = None) -> list[str]:
+        """
+        Generate and write reports for the given users, or all set-up users
+
+        Returns:
+            paths (list[str]): the paths of the written reports; users whose reports failed are logged and skipped
+        """
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        users = self.get_users(user_ids)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def generate_one(user: User) -> str | None:
+            async with semaphore:
+                try:
+                    report = await self.generate_user_report(user)
+                except Exception as e:
+                    logger.error(f"Failed to generate report for user {user.id}: {type(e).__name__}: {e}")
+                    return None
+
+            return await asyncio.to_thread(self.write_report, report)
+
+        paths = await asyncio.gather(*[generate_one(user) for user in users])
+        written = [path for path in paths if path]
+        logger.info(f"Wrote {len(written)}/{len(users)} reports to {self.output_dir}")
+        return written
@@ -0,0 +1,113 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Hashable
+
+from ..config import STEAM_MAX_CONCURRENT_REQUESTS
+
+
+class RequestPriority(IntEnum):
+    interactive = 0
+    """Requests a user is waiting on, e.g. from a bot command"""
+    background = 1
+    """Requests nobody is waiting on, e.g. background refreshes and notification polling"""
+
+
+class FairRequestScheduler:
+    """
+    Limits concurrent Steam requests, and hands out free slots fairly when requests are waiting
+
+    Each flow (e.g. one command invocation) gets its own queue, and flows in the same lane are served round-robin,
+    so a command fetching thousands of games can't hold up a command fetching one. Interactive requests are served
+    before background ones, except that every `background_share`th slot goes to background requests so they still
+    progress while the bot is busy
+    """
+
+    def __init__(self, max_concurrency: int = STEAM_MAX_CONCURRENT_REQUESTS, background_share: int = 5) -> None:
+        self.max_concurrency = max_concurrency
+        self.background_share = background_share
+
+        self._active = 0
+        self._grants = 0
+        self._lanes: dict[RequestPriority, OrderedDict[Hashable, deque[asyncio.Future]]] = {
+            priority: OrderedDict() for priority in RequestPriority
+        }
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for lane in self._lanes.values() for queue in lane.values())
+
+    @asynccontextmanager
+    async def slot(
+        self, flow: Hashable, priority: RequestPriority = RequestPriority.interactive
+    ) -> AsyncIterator[None]:
+        """Wait for a free slot, and hold it while sending a request"""
+
+        if self._active < self.max_concurrency and not self.waiting:
+            self._active += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._lanes[priority].setdefault(flow, deque()).append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # we were handed a slot as we were cancelled, so pass it on
+                    self._release()
+                else:
+                    self._discard(flow, priority, future)
+
+                raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _discard(self, flow: Hashable, priority: RequestPriority, future: asyncio.Future) -> None:
+        if (queue := self._lanes[priority].get(flow)) is None:
+            return
+
+        try:
+            queue.remove(future)
+        except ValueError:
+            return
+
+        if not queue:
+            del self._lanes[priority][flow]
+
+    def _next_lanes(self) -> list[RequestPriority]:
+        self._grants += 1
+        if self._grants % self.background_share == 0:
+            return sorted(RequestPriority, reverse=True)
+
+        return sorted(RequestPriority)
+
+    def _release(self) -> None:
+        """Hand our slot directly to the next waiting request, or free it if nothing is waiting"""
+
+        for priority in self._next_lanes():
+            lane = self._lanes[priority]
+            while lane:
+                flow, queue = next(iter(lane.items()))
+                future = queue.popleft()
+
+                # move the flow to the back of its lane, so other flows go next
+                if queue:
+                    lane.move_to_end(flow)
+                else:
+                    del lane[flow]
+
+                if not future.done():
+                    future.set_result(None)
+                    return
+
+        self._active -= 1
+
+
+request_scheduler = FairRequestScheduler()
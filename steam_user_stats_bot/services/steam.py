@@ -1,35 +1,332 @@
 import asyncio
-from typing import Any, Coroutine, TypeVar
-
-from cachetools.func import ttl_cache
-
-from ..clients.steam import SteamWebAPI
-from ..config import STEAM_CACHE_TTL, STEAM_DEFAULT_REQUEST_TIMEOUT
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+from datetime import datetime, timedelta
+from enum import Enum
+from logging import getLogger
+from typing import Any, AsyncGenerator, Callable, Coroutine, TypeVar
+
+from cachetools import TTLCache
+from httpx import AsyncBaseTransport, AsyncHTTPTransport, Response
+
+from ..clients.cache import ENDPOINT_TTLS, CachedSteamTransport, SteamResponseCache, cache_key
+from ..clients.steam import HedgedTransport, RateLimitedTransport, RequestHedger, SteamWebAPI
+from ..config import (
+    STEAM_ACHIEVEMENT_BATCH_SIZE,
+    STEAM_ACHIEVEMENT_FETCH_MODE,
+    STEAM_CACHE_TTL,
+    STEAM_DEFAULT_REQUEST_TIMEOUT,
+    STEAM_HEDGE_BUDGET,
+    STEAM_HEDGE_MIN_DELAY,
+    STEAM_HEDGE_REQUESTS,
+    STEAM_PRESENCE_CACHE_TTL,
+    STEAM_RATE_LIMIT_BURST,
+    STEAM_RATE_LIMIT_PER_SECOND,
+    STEAM_RESPONSE_CACHE_DIR,
+    STEAM_RESPONSE_CACHE_ENABLED,
+    STEAM_RESPONSE_CACHE_MAX_BYTES,
+    STEAM_SCHEMA_CACHE_TTL,
+    STEAM_SCHEMA_MEMORY_CACHE_MAX_BYTES,
+)
 from ..models.db import User
 from ..models.exceptions import InvalidResponseException, InvalidSteamKeyException
 from ..models.steam import (
+    SteamGameSchema,
     SteamGlobalGameStats,
+    SteamGlobalGameStatsAchievement,
     SteamUser,
+    SteamUserAchievementScan,
     SteamUserGame,
     SteamUserGameStats,
+    SteamUserGameStatsAchievement,
 )
+from .backends import shared_backend
+from .db import AchievementSchemaDBService
+from .offload import run_cpu_bound_then
+from .rarity import rarity_snapshots
+from .scheduler import RequestPriority, request_scheduler
+from .unlocks import unlock_history
 
 T = TypeVar("T")
 
+logger = getLogger("steam")
+
+STEAM_TOP_ACHIEVEMENTS_LIMIT = 10000
+"""Max achievements per game to request from GetTopAchievementsForGames; games at the limit may be truncated"""
+RAREST_GLOBAL_LOOKUP_SHARE = 0.5
+"""Fraction of a rarest achievement scan's time budget to spend looking up games' global percentages"""
+
+
+class AchievementFetchMode(Enum):
+    per_app = "per_app"
+    batched = "batched"
+
+
+try:
+    default_fetch_mode = AchievementFetchMode(STEAM_ACHIEVEMENT_FETCH_MODE)
+except ValueError:
+    logger.warning(f"Unknown achievement fetch mode '{STEAM_ACHIEVEMENT_FETCH_MODE}'; fetching achievements per app")
+    default_fetch_mode = AchievementFetchMode.per_app
+
+schema_db = AchievementSchemaDBService()
+response_cache = (
+    SteamResponseCache(STEAM_RESPONSE_CACHE_DIR, STEAM_RESPONSE_CACHE_MAX_BYTES)
+    if STEAM_RESPONSE_CACHE_ENABLED
+    else None
+)
+request_hedger = RequestHedger(STEAM_HEDGE_BUDGET, STEAM_HEDGE_MIN_DELAY) if STEAM_HEDGE_REQUESTS else None
+_flow_ids = itertools.count()
+
+_ACHIEVEMENT_MODEL_OVERHEAD = 400
+"""Approximate size in bytes of an achievement model, not counting its text"""
+
+
+def approximate_schema_size(schema: SteamGameSchema) -> int:
+    """Approximate in-memory size of a schema in bytes, for sizing the schema cache"""
+
+    return _ACHIEVEMENT_MODEL_OVERHEAD + sum(
+        _ACHIEVEMENT_MODEL_OVERHEAD
+        + len(achievement.api_name)
+        + len(achievement.display_name or "")
+        + len(achievement.description or "")
+        for achievement in schema.achievements
+    )
+
+
+schema_cache: TTLCache[tuple[str, str], SteamGameSchema] = TTLCache(
+    maxsize=STEAM_SCHEMA_MEMORY_CACHE_MAX_BYTES, ttl=STEAM_CACHE_TTL, getsizeof=approximate_schema_size
+)
+
+
+SchemaText = dict[str, tuple[str | None, str | None]]
+"""A game's achievement display names and descriptions by api name"""
+
+AchievementRow = tuple[str, bool, int, str | None, str | None, float | None]
+"""An achievement's api name, whether it's unlocked, unlock time (0 if unknown), display name, description, and global
+percent; parsers return these rather than models, which are much more expensive to pickle to and from a process"""
+
+
+def get_schema_text(schema: SteamGameSchema | None) -> SchemaText | None:
+    if not schema:
+        return None
+
+    return {
+        achievement.api_name: (achievement.display_name, achievement.description) for achievement in schema.achievements
+    }
+
+
+def build_user_game_stats(app_id: str, user_id: str, game_name: str, rows: list[AchievementRow]) -> SteamUserGameStats:
+    """Build a game's stats models from parsed rows, without validating them again"""
+
+    achievements = [
+        SteamUserGameStatsAchievement.construct(
+            app_id=app_id,
+            game_name=game_name,
+            api_name=api_name,
+            display_name=display_name,
+            description=description,
+            achieved=achieved,
+            achieved_at=datetime.fromtimestamp(unlocktime) if unlocktime else None,
+            global_percent=global_percent,
+        )
+        for api_name, achieved, unlocktime, display_name, description, global_percent in rows
+    ]
+    return SteamUserGameStats.construct(app_id=app_id, user_id=user_id, name=game_name, achievements=achievements)
+
+
+def parse_user_game_stats(
+    player_stats: dict, schema_text: SchemaText | None, global_percentages: dict[str, float] | None
+) -> list[AchievementRow]:
+    """
+    Parse a game's raw player achievements and join in its schema's display text and global percentages
+
+    This is CPU-bound, so it's kept at module level to be run in a process pool
+
+    Args:
+        player_stats (dict): the `playerstats` of a GetPlayerAchievements response
+        global_percentages (dict[str, float] | None): the game's global unlock percentages by achievement name
+    """
+
+    rows: list[AchievementRow] = []
+    for achievement in player_stats.get("achievements", []):
+        api_name = str(achievement["apiname"])
+        display_name, description = achievement.get("name"), achievement.get("description")
+        if schema_text and api_name in schema_text:
+            display_name, description = schema_text[api_name]
+
+        global_percent = global_percentages.get(api_name) if global_percentages is not None else None
+        rows.append(
+            (
+                api_name,
+                bool(achievement["achieved"]),
+                int(achievement.get("unlocktime") or 0),
+                display_name,
+                description,
+                float(global_percent) if global_percent is not None else None,
+            )
+        )
+
+    return rows
+
+
+def parse_top_achievements(
+    game: dict[str, Any], schema_text: SchemaText | None, include_global_percentages: bool
+) -> list[AchievementRow] | None:
+    """
+    Parse a game's GetTopAchievementsForGames response, which identifies achievements by display name rather than
+    api name; returns None if any of them can't be matched to the game's schema
+
+    This is CPU-bound, so it's kept at module level to be run in a process pool
+    """
+
+    achievements: list[dict] = game.get("achievements", [])
+    if not schema_text or len(achievements) >= STEAM_TOP_ACHIEVEMENTS_LIMIT:
+        return None
+
+    api_names_by_display_name: dict[str | None, str | None] = {}
+    for schema_api_name, (display_name, _) in schema_text.items():
+        # achievements with duplicate display names are ambiguous
+        api_names_by_display_name[display_name] = None if display_name in api_names_by_display_name else schema_api_name
+
+    rows: list[AchievementRow] = []
+    for achievement in achievements:
+        if not (api_name := api_names_by_display_name.get(achievement.get("name"))):
+            return None
+
+        rows.append(
+            (
+                api_name,
+                True,
+                # unlock times aren't included in the batch response
+                0,
+                achievement.get("name"),
+                achievement.get("desc"),
+                (
+                    float(achievement["player_percent_unlocked"])
+                    if include_global_percentages and "player_percent_unlocked" in achievement
+                    else None
+                ),
+            )
+        )
+
+    return rows
+
+
+def rank_rarest(percents: list[float | None], limit: int) -> list[int]:
+    """
+    The positions of the `limit` lowest global percents, rarest first; unknown percents are ranked last, rather than
+    as the rarest
+
+    This is CPU-bound, so it's kept at module level to be run in a process pool
+    """
+
+    return heapq.nsmallest(limit, range(len(percents)), key=lambda i: (percents[i] is None, percents[i] or 0))
+
+
+async def rank_rarest_achievements(stats: list[SteamUserGameStats], limit: int) -> list[SteamUserGameStatsAchievement]:
+    """Rank unlocked achievements from rarest to most common and return the first `limit`"""
+
+    unlocked = [achievement for game_stats in stats for achievement in game_stats.achievements if achievement.achieved]
+    return await run_cpu_bound_then(
+        rank_rarest,
+        lambda ranked: [unlocked[i] for i in ranked],
+        [achievement.global_percent for achievement in unlocked],
+        limit,
+        size=len(unlocked),
+    )
+
+
+def _cache_schema(schema: SteamGameSchema) -> None:
+    try:
+        schema_cache[(schema.app_id, schema.language)] = schema
+    except ValueError:
+        # too large for the cache; it's still in the database
+        pass
+
 
 class SteamUserService:
     """Docs: https://developer.valvesoftware.com/wiki/Steam_Web_API"""
 
     def __init__(
-        self, api_key: str, request_timeout: float | None = None, max_concurrency: int = 10, language: str = "en-US"
+        self,
+        api_key: str,
+        request_timeout: float | None = None,
+        max_concurrency: int = 10,
+        language: str = "en-US",
+        use_cache: bool = True,
+        fetch_mode: AchievementFetchMode | None = None,
+        priority: RequestPriority = RequestPriority.interactive,
     ) -> None:
+        """
+        Args:
+            use_cache (bool): Serve responses from the shared backend and response cache, if they're enabled.
+                Responses are always written to the caches, so fresh data is available to other callers
+            fetch_mode (AchievementFetchMode | None): How to fetch achievements; defaults to the configured mode.
+                Callers which need locked achievements or unlock times should use `AchievementFetchMode.per_app`
+            priority (RequestPriority): The request scheduler lane; anything nobody is waiting on should use
+                `RequestPriority.background`
+        """
+
         self.api_key = api_key
         self.timeout = request_timeout or STEAM_DEFAULT_REQUEST_TIMEOUT
         self.max_concurrency = max_concurrency
         self.language = language
+        self.use_cache = use_cache
+        self.fetch_mode = fetch_mode or default_fetch_mode
+        self.priority = priority
+
+        # each service instance is its own flow in the request scheduler
+        self.flow_id = next(_flow_ids)
+
+        self._achievements_parsed = 0
+        """Achievements parsed by this service so far, which decides when parsing is offloaded"""
 
     def client(self):
-        return SteamWebAPI(self.api_key, timeout=self.timeout)
+        acquire = self._acquire_rate_limit_token if STEAM_RATE_LIMIT_PER_SECOND > 0 else None
+        transport: AsyncBaseTransport = AsyncHTTPTransport()
+        if request_hedger:
+            # hedge timers start once a request has its rate limit token
+            transport = HedgedTransport(request_hedger, transport, acquire=acquire)
+        if acquire:
+            transport = RateLimitedTransport(acquire, transport)
+        if response_cache:
+            transport = CachedSteamTransport(response_cache, transport)
+
+        return SteamWebAPI(
+            self.api_key,
+            timeout=self.timeout,
+            transport=transport,
+            headers={} if self.use_cache else {"Cache-Control": "no-cache"},
+        )
+
+    async def _acquire_rate_limit_token(self) -> None:
+        """Wait for this API key's rate limit, which is shared with every other bot process using it"""
+
+        key_hash = hashlib.sha256(self.api_key.encode()).hexdigest()
+        await shared_backend.acquire_token(f"ratelimit:{key_hash}", STEAM_RATE_LIMIT_PER_SECOND, STEAM_RATE_LIMIT_BURST)
+
+    async def _get_json(self, client: SteamWebAPI, endpoint: str, params: dict[str, Any]) -> Any:
+        """
+        Request a Steam API endpoint and parse its JSON response
+
+        Responses from endpoints with a cache TTL are stored in the shared backend, and concurrent requests
+        for the same uncached response (from any bot process) are only sent once
+        """
+
+        async def load() -> bytes:
+            async with request_scheduler.slot(self.flow_id, self.priority):
+                r = await client.get(client.url(endpoint), params=params)
+
+            return r.content
+
+        if (ttl := ENDPOINT_TTLS.get(endpoint)) is None:
+            return json.loads(await load())
+
+        key = cache_key(endpoint, [(k, str(v)) for k, v in params.items()] + [("key", self.api_key)])
+        return json.loads(await shared_backend.get_or_load(key, ttl, load, refresh=not self.use_cache))
 
     @classmethod
     def sync(cls, coroutine: Coroutine[Any, Any, T]) -> T:
@@ -62,24 +359,69 @@ class SteamUserService:
         if "/" in vanity_id:
             vanity_id = vanity_id.rsplit("/", 1)[-1]
 
-        async with self.client() as client, asyncio.Semaphore(self.max_concurrency):
-            r = await client.get(client.url("/ISteamUser/ResolveVanityURL/v0001"), params={"vanityurl": vanity_id})
-            response = r.json()
+        async with self.client() as client:
+            response = await self._get_json(client, "/ISteamUser/ResolveVanityURL/v0001", {"vanityurl": vanity_id})
 
         return response["response"].get("steamid")
 
     async def get_user_summaries(self, user_ids: list[str]) -> list[SteamUser]:
-        async with self.client() as client, asyncio.Semaphore(self.max_concurrency):
-            r = await client.get(client.url("/ISteamUser/GetPlayerSummaries/v0002"), params={"steamids": user_ids})
-            users = r.json()["response"]["players"]
+        """Get user summaries, requesting up to 100 users at a time for any that aren't cached"""
+
+        async def request(batch: list[str]) -> Response:
+            async with request_scheduler.slot(self.flow_id, self.priority):
+                return await client.get(client.url(endpoint), params={"steamids": ",".join(batch)})
 
-        return [SteamUser.parse_obj(user) for user in users]
+        endpoint = "/ISteamUser/GetPlayerSummaries/v0002"
+        unique_user_ids = list(dict.fromkeys(user_ids))
+
+        # summaries are cached per user, rather than per request, so they can be reused in any batch
+        keys = {
+            user_id: cache_key(endpoint, [("key", self.api_key), ("steamids", user_id)]) for user_id in unique_user_ids
+        }
+        cached = await shared_backend.get_many(list(keys.values())) if self.use_cache else []
+        users_by_id = {user_id: SteamUser.parse_raw(body) for user_id, body in zip(unique_user_ids, cached) if body}
+
+        missing_user_ids = [user_id for user_id in unique_user_ids if user_id not in users_by_id]
+        if missing_user_ids:
+            async with self.client() as client:
+                r = await asyncio.gather(
+                    *[
+                        request(batch)
+                        for batch in [missing_user_ids[i : i + 100] for i in range(0, len(missing_user_ids), 100)]
+                    ]
+                )
+
+            for response in r:
+                for user in response.json()["response"]["players"]:
+                    steam_user = SteamUser.parse_obj(user)
+                    users_by_id[steam_user.steam_id] = steam_user
+                    await shared_backend.set(
+                        keys[steam_user.steam_id], json.dumps(user).encode(), STEAM_PRESENCE_CACHE_TTL
+                    )
+
+        return [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id]
 
-    @ttl_cache(ttl=STEAM_CACHE_TTL)
     async def get_user_summary(self, user_id: str) -> SteamUser | None:
         users = await self.get_user_summaries([user_id])
         return users[0] if users else None
 
+    async def get_friend_ids(self, user_id: str) -> list[str]:
+        """Get the steam ids of a user's friends; returns an empty list if their friend list is private"""
+
+        try:
+            async with self.client() as client:
+                response = await self._get_json(
+                    client, "/ISteamUser/GetFriendList/v0001", {"steamid": user_id, "relationship": "friend"}
+                )
+                friends = response.get("friendslist", {}).get("friends", [])
+
+        except InvalidSteamKeyException:
+            raise
+        except InvalidResponseException:
+            return []
+
+        return [friend["steamid"] for friend in friends]
+
     async def get_owned_games(
         self,
         user_id: str,
@@ -101,72 +443,444 @@ class SteamUserService:
             "include_appinfo": str(include_game_info).lower(),
         }
 
-        async with self.client() as client, asyncio.Semaphore(self.max_concurrency):
-            r = await client.get(client.url("/IPlayerService/GetOwnedGames/v0001"), params=params)
-            games = r.json()["response"]["games"]
+        async with self.client() as client:
+            response = await self._get_json(client, "/IPlayerService/GetOwnedGames/v0001", params)
+            games = response["response"]["games"]
+
+        return [SteamUserGame(**{"user_id": user_id} | game) for game in games]
+
+    async def get_recently_played_games(self, user_id: str) -> list[SteamUserGame]:
+        """Get the games a user has played in the last two weeks; much cheaper than fetching all owned games"""
+
+        async with self.client() as client:
+            response = await self._get_json(
+                client, "/IPlayerService/GetRecentlyPlayedGames/v0001", {"steamid": user_id}
+            )
+            games = response["response"].get("games", [])
 
         return [SteamUserGame(**{"user_id": user_id} | game) for game in games]
 
     ### Achievements ###
 
-    @ttl_cache(ttl=STEAM_CACHE_TTL)
+    async def _get_global_percentages(self, client: SteamWebAPI, game_id: str) -> dict[str, float]:
+        """Get a game's global unlock percentages by achievement name, from the rarity snapshot if possible"""
+
+        if rarity_snapshots and (percentages := rarity_snapshots.get_percents(game_id)) is not None:
+            return percentages
+
+        response = await self._get_json(
+            client, "/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002", {"gameid": game_id}
+        )
+        percentages = {
+            achievement["name"]: float(achievement["percent"])
+            for achievement in response["achievementpercentages"].get("achievements", [])
+        }
+        if rarity_snapshots:
+            rarity_snapshots.add(game_id, percentages)
+
+        return percentages
+
     async def _get_global_achievement_stats_for_one_game(
         self, client: SteamWebAPI, game_id: str
     ) -> SteamGlobalGameStats:
-        r = await client.get(
-            client.url("/ISteamUserStats/GetGlobalAchievementPercentagesForApp/v0002"), params={"gameid": game_id}
+        percentages = await self._get_global_percentages(client, game_id)
+        return SteamGlobalGameStats(
+            app_id=game_id,
+            achievements=[
+                SteamGlobalGameStatsAchievement(name=name, percent=percent) for name, percent in percentages.items()
+            ],
         )
-        stats = r.json()["achievementpercentages"]
-        return SteamGlobalGameStats(**{"app_id": game_id} | stats)
 
     async def get_global_achievement_stats(self, game_ids: list[str]) -> list[SteamGlobalGameStats]:
-        async with self.client() as client, asyncio.Semaphore(self.max_concurrency):
+        async with self.client() as client:
             responses = await asyncio.gather(
                 *[self._get_global_achievement_stats_for_one_game(client, game_id) for game_id in game_ids]
             )
 
         return responses
 
-    @ttl_cache(ttl=STEAM_CACHE_TTL)
+    async def _get_achievement_schema_for_one_game(
+        self, client: SteamWebAPI, game_id: str, refresh: bool = False
+    ) -> SteamGameSchema | None:
+        """Get a game's localized achievement schema, from memory or the database if possible"""
+
+        key = (game_id, self.language)
+        if not refresh:
+            if schema := schema_cache.get(key):
+                return schema
+
+            # the database is SQLite, so it's read in a thread rather than blocking the event loop for every game
+            schema = await asyncio.to_thread(schema_db.get_schema, game_id, self.language)
+            if schema and datetime.now() - schema.fetched_at < timedelta(seconds=STEAM_SCHEMA_CACHE_TTL):
+                _cache_schema(schema)
+                return schema
+
+        try:
+            response = await self._get_json(
+                client, "/ISteamUserStats/GetSchemaForGame/v2", {"appid": game_id, "l": self.language}
+            )
+            game = response.get("game", {})
+
+        except InvalidResponseException:
+            return None
+
+        schema = SteamGameSchema(**{"app_id": game_id, "language": self.language} | game)
+        await asyncio.to_thread(schema_db.save_schema, schema)
+        _cache_schema(schema)
+        return schema
+
     async def _get_user_achievements_for_one_game(
         self, client: SteamWebAPI, user_id: str, game_id: str, include_global_percentages: bool = False
     ) -> SteamUserGameStats | None:
+        # display text is joined in from the game's schema, so we only request the compact unlock data here
         try:
-            r = await client.get(
-                client.url("/ISteamUserStats/GetPlayerAchievements/v0001"),
-                params={"steamid": user_id, "appid": game_id, "l": self.language},
+            response = await self._get_json(
+                client, "/ISteamUserStats/GetPlayerAchievements/v0001", {"steamid": user_id, "appid": game_id}
             )
-            stats = r.json()["playerstats"]
+            stats = response["playerstats"]
             if "error" in stats:
                 return None
 
         except InvalidResponseException:
             return None
 
-        user_stats = SteamUserGameStats(**{"app_id": game_id} | stats)
-        if not include_global_percentages:
-            return user_stats
+        api_names = {achievement["apiname"] for achievement in stats.get("achievements", [])}
+        schema = await self._get_achievement_schema_for_achievements(client, game_id, api_names) if api_names else None
 
-        # fetch global stats and add to user stats
-        global_stats = await self._get_global_achievement_stats_for_one_game(client, game_id)
-        global_stats_by_achievement_name = {
-            achievement.api_name: achievement for achievement in global_stats.achievements
-        }
-        for achievement in user_stats.achievements:
-            if achievement.api_name in global_stats_by_achievement_name:
-                achievement.global_percent = global_stats_by_achievement_name[achievement.api_name].percent
+        global_percentages: dict[str, float] | None = None
+        if include_global_percentages:
+            global_percentages = await self._get_global_percentages(client, game_id)
+
+        return await self._parse(
+            parse_user_game_stats,
+            functools.partial(build_user_game_stats, game_id, stats["steamID"], stats["gameName"]),
+            stats,
+            get_schema_text(schema),
+            global_percentages,
+            size=len(api_names),
+        )
+
+    async def _parse(
+        self, func: Callable[..., list[AchievementRow] | None], then: Callable[[Any], T], *args: Any, size: int
+    ) -> T:
+        """
+        Parse a response, offloading it from the event loop once this service has parsed enough achievements
+
+        Most games only have a few achievements, but a large library is thousands of small parses, which block the
+        event loop just as much as one large one, so this compares the running total to the offload threshold
+        rather than each game's size; `then` builds the parsed rows into models
+        """
+
+        self._achievements_parsed += size
+        return await run_cpu_bound_then(func, then, *args, size=self._achievements_parsed)
+
+    async def _get_achievement_schema_for_achievements(
+        self, client: SteamWebAPI, game_id: str, api_names: set[str]
+    ) -> SteamGameSchema | None:
+        schema = await self._get_achievement_schema_for_one_game(client, game_id)
+        if (
+            schema
+            and datetime.now() - schema.fetched_at > timedelta(seconds=STEAM_CACHE_TTL)
+            and not api_names.issubset(achievement.api_name for achievement in schema.achievements)
+        ):
+            # the game has added achievements since we stored its schema
+            schema = await self._get_achievement_schema_for_one_game(client, game_id, refresh=True)
+
+        return schema
+
+    async def _get_game_names(self, user_id: str) -> dict[str, str]:
+        try:
+            games = await self.get_owned_games(user_id, include_game_info=True)
+        except (InvalidResponseException, KeyError):
+            # the user's game details are private
+            return {}
+
+        return {game.app_id: game.name for game in games if game.name}
+
+    async def _get_user_achievements_for_batch(
+        self, client: SteamWebAPI, user_id: str, game_ids: list[str], include_global_percentages: bool = False
+    ) -> list[SteamUserGameStats | None]:
+        """
+        Fetch achievements for several games, in the order of `game_ids`
+
+        In batched mode, games are requested together and anything the batch can't answer falls back to per-app
+        requests; in per-app mode, each game is requested separately. Unlocks are recorded in the unlock history
+        """
+
+        if self.fetch_mode is AchievementFetchMode.per_app:
+            results = await asyncio.gather(
+                *[
+                    self._get_user_achievements_for_one_game(client, user_id, game_id, include_global_percentages)
+                    for game_id in game_ids
+                ]
+            )
+
+        else:
+            results = await self._get_user_achievements_for_top_batch(
+                client, user_id, game_ids, include_global_percentages
+            )
+
+        unlock_history.record(user_id, [stats for stats in results if stats])
+        return list(results)
+
+    async def _get_user_achievements_for_top_batch(
+        self, client: SteamWebAPI, user_id: str, game_ids: list[str], include_global_percentages: bool
+    ) -> list[SteamUserGameStats | None]:
+        params: dict[str, Any] = {"steamid": user_id, "language": self.language}
+        params["max_achievements"] = STEAM_TOP_ACHIEVEMENTS_LIMIT
+        params.update({f"appids[{i}]": game_id for i, game_id in enumerate(game_ids)})
+        try:
+            response = await self._get_json(client, "/IPlayerService/GetTopAchievementsForGames/v1", params)
+            games = {str(game["appid"]): game for game in response.get("response", {}).get("games", [])}
+
+        except InvalidResponseException:
+            games = {}
+
+        # the batch response doesn't include game names
+        game_names = await self._get_game_names(user_id) if games else {}
 
-        return user_stats
+        async def resolve(game_id: str) -> SteamUserGameStats | None:
+            if (game := games.get(game_id)) and game_id in game_names:
+                if not game.get("total_achievements"):
+                    return None
+
+                schema = await self._get_achievement_schema_for_one_game(client, game_id)
+                build = functools.partial(build_user_game_stats, game_id, user_id, game_names[game_id])
+                if stats := await self._parse(
+                    parse_top_achievements,
+                    lambda rows: build(rows) if rows is not None else None,
+                    game,
+                    get_schema_text(schema),
+                    include_global_percentages,
+                    size=len(game.get("achievements", [])),
+                ):
+                    return stats
+
+            return await self._get_user_achievements_for_one_game(client, user_id, game_id, include_global_percentages)
+
+        return list(await asyncio.gather(*[resolve(game_id) for game_id in game_ids]))
+
+    @property
+    def batch_size(self) -> int:
+        return STEAM_ACHIEVEMENT_BATCH_SIZE if self.fetch_mode is AchievementFetchMode.batched else 1
+
+    def _batch(self, game_ids: list[str]) -> list[list[str]]:
+        return [game_ids[i : i + self.batch_size] for i in range(0, len(game_ids), self.batch_size)]
 
     async def get_user_achievements(
         self, user_id: str, game_ids: list[str], include_global_percentages: bool = False
     ) -> list[SteamUserGameStats]:
-        async with self.client() as client, asyncio.Semaphore(self.max_concurrency):
+        async with self.client() as client:
             responses = await asyncio.gather(
                 *[
-                    self._get_user_achievements_for_one_game(client, user_id, app_id, include_global_percentages)
-                    for app_id in game_ids
+                    self._get_user_achievements_for_batch(client, user_id, batch, include_global_percentages)
+                    for batch in self._batch(game_ids)
                 ]
             )
 
-        return [r for r in responses if r]
+        return [r for batch_responses in responses for r in batch_responses if r]
+
+    async def iter_user_achievements(
+        self, user_id: str, game_ids: list[str], include_global_percentages: bool = False
+    ) -> AsyncGenerator[SteamUserGameStats, None]:
+        """
+        Yield each game's achievement stats as soon as they arrive, rather than collecting all of them first
+
+        At most `max_concurrency` results are buffered, so a slow consumer slows down fetching
+        """
+
+        queue: asyncio.Queue[SteamUserGameStats | Exception | None] = asyncio.Queue(maxsize=self.max_concurrency)
+        batches = self._batch(game_ids)
+        remaining_batches = iter(batches)
+
+        async def worker(client: SteamWebAPI) -> None:
+            # workers share the iterator, so each game is only fetched once
+            for batch in remaining_batches:
+                try:
+                    results: list[SteamUserGameStats | Exception | None] = list(
+                        await self._get_user_achievements_for_batch(client, user_id, batch, include_global_percentages)
+                    )
+                except Exception as e:
+                    results = [e] * len(batch)
+
+                for result in results:
+                    await queue.put(result)
+
+        async with self.client() as client:
+            workers = [asyncio.create_task(worker(client)) for _ in range(min(self.max_concurrency, len(batches)))]
+            try:
+                for _ in range(len(game_ids)):
+                    result = await queue.get()
+                    if isinstance(result, Exception):
+                        raise result
+                    if result:
+                        yield result
+
+            finally:
+                for task in workers:
+                    task.cancel()
+
+                await asyncio.gather(*workers, return_exceptions=True)
+
+    @classmethod
+    def prioritize_games(cls, games: list[SteamUserGame]) -> list[SteamUserGame]:
+        """Sort games by most recently played, then by most played"""
+
+        return sorted(games, key=lambda game: (game.last_played or datetime.min, game.playtime.all_time), reverse=True)
+
+    async def _get_rarest_global_percents(
+        self, client: SteamWebAPI, game_ids: list[str], deadline: float
+    ) -> dict[str, float | None]:
+        """
+        Get the global percent of each game's rarest achievement, or None for games without achievements
+
+        Games which can't be checked before the deadline, or whose lookup fails, are left out
+        """
+
+        async def fetch(game_id: str) -> float | None:
+            if rarity_snapshots:
+                found, rarest_percent = rarity_snapshots.get_rarest_percent(game_id)
+                if found:
+                    return rarest_percent
+
+            try:
+                percentages = await self._get_global_percentages(client, game_id)
+            except InvalidResponseException:
+                return None
+
+            return min(percentages.values(), default=None)
+
+        if not game_ids:
+            return {}
+
+        tasks = {asyncio.create_task(fetch(game_id)): game_id for game_id in game_ids}
+        done, pending = await asyncio.wait(tasks, timeout=max(deadline - asyncio.get_running_loop().time(), 0))
+        for task in pending:
+            task.cancel()
+
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        rarest_global_percents: dict[str, float | None] = {}
+        for task in done:
+            if e := task.exception():
+                logger.debug(f"Failed to get global percentages for game {tasks[task]}: {type(e).__name__}: {e}")
+                continue
+
+            rarest_global_percents[tasks[task]] = task.result()
+
+        return rarest_global_percents
+
+    async def get_rarest_user_achievements_before_deadline(
+        self, user_id: str, games: list[SteamUserGame], limit: int, deadline: float
+    ) -> SteamUserAchievementScan:
+        """
+        Find a user's `limit` rarest unlocked achievements, skipping games which can't contain any of them
+
+        Games are scanned in order of their rarest global achievement, and scanning stops once no remaining game's
+        rarest achievement is rarer than the `limit`th rarest unlocked achievement found so far. Global percentages
+        are public and cached, so this needs far fewer player requests than scanning every game. Up to half of the
+        time budget is spent looking up global percentages; games which couldn't be looked up are scanned last. Games
+        with equally rare achievements, and unchecked games, are scanned most recently played first, then most played
+
+        Args:
+            user_id (str): The id of the steam user
+            games (list[SteamUserGame]): The games to search
+            limit (int): The number of rarest achievements to find
+            deadline (float): The event loop time to stop fetching at, e.g. `loop.time() + 10`
+
+        Returns:
+            scan (SteamUserAchievementScan): the stats of each scanned game; their rarest `limit` unlocked
+                achievements are the user's rarest
+        """
+
+        loop = asyncio.get_running_loop()
+        async with self.client() as client:
+            # leave the rest of the time for fetching the user's achievements
+            now = loop.time()
+            rarest_global_percents = await self._get_rarest_global_percents(
+                client, [game.app_id for game in games], now + max(deadline - now, 0) * RAREST_GLOBAL_LOOKUP_SHARE
+            )
+
+            # games without global stats have no achievements; the sort is stable, so games whose rarest achievements
+            # are equally rare are scanned most recently played first, in case the deadline cuts the scan short
+            prioritized_game_ids = [game.app_id for game in self.prioritize_games(games)]
+            checked_game_ids = sorted(
+                [game_id for game_id in prioritized_game_ids if rarest_global_percents.get(game_id) is not None],
+                key=lambda game_id: rarest_global_percents[game_id] or 0,
+            )
+
+            # games we couldn't check can't be ruled out, but whatever slowed down their lookup will likely slow down
+            # their fetch too, so they're scanned last, most recently played first
+            unchecked_game_ids = [game_id for game_id in prioritized_game_ids if game_id not in rarest_global_percents]
+            batches = self._batch(checked_game_ids)
+            first_unchecked_batch = len(batches)
+            batches += self._batch(unchecked_game_ids)
+
+            # max-heap of the rarest unlocked percents so far
+            rarest: list[float] = []
+            stats: list[SteamUserGameStats] = []
+            games_scanned = len(rarest_global_percents) - len(checked_game_ids)
+            games_ruled_out = 0
+            next_batch = 0
+            pending: dict[asyncio.Task, list[str]] = {}
+
+            def can_improve(batch: list[str]) -> bool:
+                return len(rarest) < limit or (rarest_global_percents[batch[0]] or 0) < -rarest[0]
+
+            try:
+                while True:
+                    while len(pending) < self.max_concurrency and next_batch < len(batches):
+                        if next_batch < first_unchecked_batch and not can_improve(batches[next_batch]):
+                            # the checked games are sorted, so if the next one can't improve the result, none of them can
+                            games_ruled_out = sum(len(batch) for batch in batches[next_batch:first_unchecked_batch])
+                            next_batch = first_unchecked_batch
+                            continue
+
+                        batch = batches[next_batch]
+                        task = asyncio.create_task(
+                            self._get_user_achievements_for_batch(
+                                client, user_id, batch, include_global_percentages=True
+                            )
+                        )
+                        pending[task] = batch
+                        next_batch += 1
+
+                    if not pending:
+                        break
+
+                    done, _ = await asyncio.wait(
+                        pending, timeout=max(deadline - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        break
+
+                    for task in done:
+                        batch = pending.pop(task)
+                        if task.exception() is not None:
+                            continue
+
+                        games_scanned += len(batch)
+                        for game_stats in task.result():
+                            if not game_stats:
+                                continue
+
+                            stats.append(game_stats)
+                            for achievement in game_stats.achievements:
+                                if not achievement.achieved:
+                                    continue
+
+                                percent = achievement.global_percent or 0
+                                if len(rarest) < limit:
+                                    heapq.heappush(rarest, -percent)
+                                elif percent < -rarest[0]:
+                                    heapq.heapreplace(rarest, -percent)
+
+            finally:
+                for task in pending:
+                    task.cancel()
+
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return SteamUserAchievementScan(
+            stats=stats, games_scanned=games_scanned, games_total=len(games), games_ruled_out=games_ruled_out
+        )
@@ -0,0 +1,67 @@
+import asyncio
+from logging import getLogger
+
+from ..models.steam import SteamUserGameStats
+from .db import UserAchievementDBService, UserDBService
+
+logger = getLogger("unlock_history")
+
+UNLOCK_HISTORY_FLUSH_DELAY = 5.0
+"""How long (in seconds) to buffer fetched unlocks before writing them to the database"""
+
+
+class UnlockHistory:
+    """
+    Records the unlocks seen by every achievement fetch, so recent unlocks can be read from the database
+
+    Fetches happen a game or batch at a time, so unlocks are buffered and written together in a background thread,
+    rather than committing once per game on the event loop
+    """
+
+    def __init__(self, flush_delay: float = UNLOCK_HISTORY_FLUSH_DELAY) -> None:
+        self.flush_delay = flush_delay
+        self.db = UserAchievementDBService()
+        self.users_db = UserDBService()
+
+        self._pending: dict[str, dict[str, SteamUserGameStats]] = {}
+        self._flush_task: asyncio.Task | None = None
+
+    def record(self, steam_id: str, stats: list[SteamUserGameStats]) -> None:
+        stats = [game_stats for game_stats in stats if any(a.achieved for a in game_stats.achievements)]
+        if not stats:
+            return
+
+        pending = self._pending.setdefault(steam_id, {})
+        pending.update({game_stats.app_id: game_stats for game_stats in stats})
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_delay)
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Failed to record unlocks")
+
+    def _save(self, pending: dict[str, dict[str, SteamUserGameStats]]) -> None:
+        # unlocks are stored by Discord user, and more than one user can set up the same Steam account
+        user_ids_by_steam_id: dict[str, list[str]] = {}
+        for user in self.users_db.get_users_by_steam_id(list(pending)):
+            if user.steam_id_64:
+                user_ids_by_steam_id.setdefault(user.steam_id_64, []).append(user.id)
+
+        for steam_id, stats in pending.items():
+            for user_id in user_ids_by_steam_id.get(steam_id, []):
+                self.db.save_unlocks(user_id, list(stats.values()))
+
+    async def flush(self) -> None:
+        """Write any buffered unlocks to the database"""
+
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        await asyncio.to_thread(self._save, pending)
+
+
+unlock_history = UnlockHistory()